@@ -2,39 +2,1428 @@ import tkinter as tk
 from tkinter import filedialog, ttk
 import cv2
 import numpy as np
-import gpxpy
 import datetime
 import os
-import matplotlib.pyplot as plt
+import subprocess
+import functools
+import queue
+import tempfile
+import json
+import hashlib
+import shutil
+from collections import namedtuple
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import multiprocessing
+from multiprocessing import shared_memory
 import matplotlib.dates as mdates
 from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from PIL import Image, ImageTk
-import pandas as pd
-from bisect import bisect_left
 import threading
+import time
 import pytz  # Add pytz for timezone support
 
-class GPXVideoOverlay:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("Garmin .FIT Video Overlay")  # Rename the tool
-        
-        # Make window open in full screen
-        screen_width = root.winfo_screenwidth()
-        screen_height = root.winfo_screenheight()
-        self.root.geometry(f"{screen_width}x{screen_height}")
-        
-        # Variables
-        self.video_path = None
-        self.gpx_path = None
-        self.output_path = None
-        self.gpx_data = None
-        self.video_cap = None
-        self.current_frame = None
-        self.current_frame_idx = 0
-        self.total_frames = 0
-        self.video_fps = 0
-        self.video_duration = 0
+# Export profiles: output short side (None keeps the input resolution), x264 settings
+# and whether the decoder may skip the loop filter to decode faster.
+EXPORT_PROFILES = {
+    'draft': {'height': 540, 'preset': 'ultrafast', 'crf': 28, 'fast_decode': True},
+    'standard': {'height': 1080, 'preset': 'medium', 'crf': 21, 'fast_decode': False},
+    'master': {'height': None, 'preset': 'slow', 'crf': 18, 'fast_decode': False},
+}
+
+# Compositing backends: 'python' draws into every decoded frame, 'ffmpeg'
+# overlays Python-rendered panel tiles in an ffmpeg filter graph
+EXPORT_BACKENDS = ('python', 'ffmpeg')
+
+# Alpha-capable codecs for overlay-only exports (QuickTime .mov)
+OVERLAY_CODECS = {
+    'qtrle': ['-c:v', 'qtrle', '-pix_fmt', 'argb'],  # QuickTime Animation, skips unchanged lines
+    'png': ['-c:v', 'png', '-pix_fmt', 'rgba'],
+    'prores4444': ['-c:v', 'prores_ks', '-profile:v', '4444', '-pix_fmt', 'yuva444p10le'],
+}
+
+# Watch-folder mode: file types it picks up, and the index it keeps of the
+# activities' time ranges so restarts don't parse every file again
+WATCH_VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv')
+WATCH_ACTIVITY_EXTENSIONS = ('.fit', '.gpx')
+WATCH_INDEX_NAME = '.overlay_index.json'
+
+# Merging several activity files: a channel is interpolated between samples
+# of a source at most this far apart and otherwise left to the next source
+MERGE_TOLERANCE_SECONDS = 5
+
+# Resumable exports are rendered in segments of this length; an interruption
+# loses at most one segment of work
+SEGMENT_SECONDS = 60
+
+# Reusable frame buffers per export: enough for the decode and encode queues to stay full
+FRAME_POOL_SIZE = 6
+
+# Overlay sizes below are tuned for this frame height and scaled for other sizes
+LAYOUT_REFERENCE_HEIGHT = 1080
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+# Metric boxes of the panel, top to bottom, and the telemetry channel each one needs
+PANEL_METRICS = ('activity_type', 'time', 'heart_rate', 'speed', 'avg_heart_rate',
+                 'avg_speed', 'cadence', 'elevation', 'distance')
+METRIC_CHANNELS = {
+    'activity_type': 'activity_type', 'time': 'time', 'heart_rate': 'heart_rate',
+    'speed': 'speed', 'avg_heart_rate': 'heart_rate', 'avg_speed': 'speed',
+    'cadence': 'cadence', 'elevation': 'elevation', 'distance': 'distance',
+}
+
+PANEL_ALPHA = 0.65  # Opacity of the metric boxes and their text
+
+# Graph boxes below the metric boxes: telemetry channel, line color (BGR) and
+# whether the graph scrolls with the last graph_window_seconds (otherwise it
+# shows the whole activity with a cursor)
+GRAPH_WIDGETS = {
+    'hr_graph': ('heart_rate', (80, 80, 235), True),
+    'speed_graph': ('speed', (235, 170, 60), True),
+    'elevation_profile': ('elevation', (90, 205, 90), False),
+}
+GRAPH_WINDOWS = {'1 min': 60, '5 min': 300, '15 min': 900, 'Whole activity': None}
+
+# Clockwise rotations as ffmpeg filters and OpenCV rotate codes
+ROTATION_FILTERS = {90: 'transpose=clock', 180: 'hflip,vflip', 270: 'transpose=cclock'}
+ROTATION_CODES = {90: cv2.ROTATE_90_CLOCKWISE, 180: cv2.ROTATE_180, 270: cv2.ROTATE_90_COUNTERCLOCKWISE}
+
+# Static part of the metric panel, see compile_panel_layout(). chrome is a
+# uint8 BGRA tile with BGR premultiplied by alpha; slots are (metric, x, y)
+# text origins for the per-frame values; graphs are (widget, x, y, width,
+# height) plot areas inside the chrome.
+PanelLayout = namedtuple('PanelLayout', ['x', 'y', 'chrome', 'slots', 'graphs', 'font_size', 'font_thickness'])
+
+
+@functools.lru_cache(maxsize=None)
+def ffmpeg_available():
+    """Check once whether the ffmpeg binary can be executed"""
+    try:
+        subprocess.check_output(['ffmpeg', '-version'], stderr=subprocess.STDOUT)
+        return True
+    except Exception:
+        return False
+
+
+def ffmpeg_input_args(source):
+    """ffmpeg arguments that read a video file, or a list of chapter files as one input.
+
+    Chapters go through the concat demuxer, so nothing is concatenated on disk.
+    Returns (args, concat script to delete afterwards or None).
+    """
+    if isinstance(source, (list, tuple)):
+        if len(source) > 1:
+            fd, script = tempfile.mkstemp(suffix='.ffconcat')
+            with os.fdopen(fd, 'w') as f:
+                f.write('ffconcat version 1.0\n')
+                for path in source:
+                    escaped = os.path.abspath(path).replace("'", "'\\''")
+                    # Pin each chapter to its video length; the container duration
+                    # often includes trailing audio, which would leave a gap
+                    _, _, fps, count = video_properties(path)
+                    f.write(f"file '{escaped}'\nduration {count / fps:.6f}\n")
+            return ['-f', 'concat', '-safe', '0', '-i', script], script
+        source = source[0]
+    return ['-i', source], None
+
+
+def open_capture(path):
+    """cv2.VideoCapture of one file that returns frames as stored, ignoring rotation metadata.
+
+    OpenCV builds differ in whether (and how) they apply a display matrix, so
+    the app reads the rotation with video_rotation() and applies it itself.
+    """
+    cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_ORIENTATION_AUTO, 0)
+    return cap
+
+
+def video_rotation(source):
+    """Clockwise rotation (0, 90, 180 or 270) the container asks players to apply"""
+    path = source[0] if isinstance(source, (list, tuple)) else source
+    cap = cv2.VideoCapture(path)
+    rotation = int(round(cap.get(cv2.CAP_PROP_ORIENTATION_META) / 90)) * 90 % 360
+    cap.release()
+    return rotation
+
+
+def video_orientation(source, rotate_180=False):
+    """Clockwise rotation that makes the frames of a video upright, plus the user's 180° flip"""
+    return (video_rotation(source) + (180 if rotate_180 else 0)) % 360
+
+
+def orient_frame(frame, rotation, dst=None):
+    """Rotate a frame clockwise by rotation degrees into dst in one pass (a copy for 0)"""
+    if rotation == 0:
+        if dst is None:
+            return frame.copy()
+        np.copyto(dst, frame)
+        return dst
+    if rotation == 180:
+        return cv2.flip(frame, -1, dst=dst)
+    return cv2.rotate(frame, ROTATION_CODES[rotation], dst=dst)
+
+
+class OrientedCapture:
+    """Capture wrapper returning frames rotated upright (OpenCV fallback when ffmpeg is missing)"""
+
+    def __init__(self, cap, rotation):
+        self.cap = cap
+        self.rotation = rotation
+
+    def __getattr__(self, name):
+        return getattr(self.cap, name)
+
+    def read(self, image=None):
+        ret, frame = self.cap.read()
+        if not ret:
+            return False, None
+        height, width = frame.shape[:2] if self.rotation == 180 else frame.shape[1::-1]
+        if image is not None and image.shape[:2] != (height, width):
+            image = None  # A different output size is scaled to afterwards by read_frame_into()
+        return True, orient_frame(frame, self.rotation, dst=image)
+
+
+class ChapteredVideo:
+    """Chapter files of one recording presented as a single video.
+
+    Mimics the parts of cv2.VideoCapture the app uses. Global frame numbers map
+    to (chapter, local frame) through the chapters' start frames; a chapter is
+    only opened for decoding when a frame in it is read.
+    """
+
+    def __init__(self, paths):
+        self.paths = list(paths)
+        counts = []
+        for i, path in enumerate(self.paths):
+            cap = open_capture(path)
+            if not cap.isOpened():
+                raise RuntimeError(f"Could not open video file {path}")
+            if i == 0:
+                self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+                self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                self.fps = cap.get(cv2.CAP_PROP_FPS)
+            counts.append(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+            cap.release()
+        self.chapter_starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+        self.frame_count = int(sum(counts))
+        self._chapter = None
+        self._cap = None
+        self._pos = 0
+
+    def locate(self, frame_idx):
+        """Return (chapter index, frame within the chapter) of a global frame"""
+        chapter = int(np.searchsorted(self.chapter_starts, frame_idx, side='right')) - 1
+        return chapter, frame_idx - int(self.chapter_starts[chapter])
+
+    def _open_chapter(self, chapter):
+        if self._cap is not None:
+            self._cap.release()
+        self._cap = open_capture(self.paths[chapter])
+        self._chapter = chapter
+
+    def isOpened(self):
+        return self.frame_count > 0
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return self.frame_count
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self._pos
+        return 0
+
+    def set(self, prop, value):
+        if prop != cv2.CAP_PROP_POS_FRAMES:
+            return False
+        self._pos = max(0, min(int(value), self.frame_count))
+        if self._pos < self.frame_count:
+            chapter, local_frame = self.locate(self._pos)
+            if chapter != self._chapter:
+                self._open_chapter(chapter)
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, local_frame)
+        return True
+
+    def read(self, image=None):
+        if self._pos >= self.frame_count:
+            return False, None
+        chapter, local_frame = self.locate(self._pos)
+        if chapter != self._chapter:
+            # Crossing into the next chapter continues at its first frame
+            self._open_chapter(chapter)
+            if local_frame:
+                self._cap.set(cv2.CAP_PROP_POS_FRAMES, local_frame)
+        ret, frame = self._cap.read(image)
+        if not ret and chapter + 1 < len(self.paths):
+            # The container overstated its frame count; go on with the next chapter
+            self._pos = int(self.chapter_starts[chapter + 1])
+            return self.read(image)
+        if ret:
+            self._pos += 1
+        return ret, frame
+
+    def release(self):
+        if self._cap is not None:
+            self._cap.release()
+        self._cap = None
+        self._chapter = None
+
+
+def open_video(source):
+    """Open a video file, or a list of chapter files as one ChapteredVideo (frames as stored, see open_capture())"""
+    if isinstance(source, (list, tuple)):
+        return ChapteredVideo(source) if len(source) > 1 else open_capture(source[0])
+    return open_capture(source)
+
+
+class FFmpegFrameReader:
+    """Decode a video through an ffmpeg rawvideo pipe with the cv2.VideoCapture read() API"""
+
+    def __init__(self, path, size, fast_decode=False, start_time=0.0, frame_count=None, threads=None,
+                 rotation=0):
+        # size is the output size after rotating the frames clockwise by rotation degrees
+        self.width, self.height = size
+        self.frame_bytes = self.width * self.height * 3
+        cmd = ['ffmpeg', '-v', 'error']
+        if threads:
+            cmd += ['-threads', str(threads)]
+        if fast_decode:
+            # Trade a little quality for speed (skips H.264/HEVC deblocking)
+            cmd += ['-skip_loop_filter', 'all', '-flags2', 'fast']
+        if start_time > 0:
+            # Input seeking jumps to the keyframe before start_time and only decodes from there
+            cmd += ['-ss', f'{start_time:.6f}']
+        input_args, self._concat_script = ffmpeg_input_args(path)
+        # Rotation is applied explicitly (the concat demuxer would drop the display matrix anyway)
+        cmd += ['-noautorotate'] + input_args
+        if frame_count is not None:
+            # A frame limit stays exact where chapter timestamps don't line up
+            cmd += ['-frames:v', str(frame_count)]
+        filters = [ROTATION_FILTERS[rotation]] if rotation else []
+        cmd += [
+            '-an', '-sn',
+            '-vf', ','.join(filters + [f'scale={self.width}:{self.height}']),
+            '-fps_mode', 'passthrough',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-'
+        ]
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def isOpened(self):
+        return not self.proc.stdout.closed
+
+    def read(self, image=None):
+        """Read the next frame, decoding in place into image when it is given"""
+        frame = image if image is not None else np.empty((self.height, self.width, 3), np.uint8)
+        view = memoryview(frame).cast('B')
+        filled = 0
+        while filled < self.frame_bytes:
+            n = self.proc.stdout.readinto(view[filled:])
+            if not n:
+                return False, None
+            filled += n
+        return True, frame
+
+    def release(self):
+        self.proc.stdout.close()
+        if self.proc.poll() is None:
+            self.proc.terminate()
+        self.proc.wait()
+        if self._concat_script:
+            os.remove(self._concat_script)
+
+
+class FFmpegFrameWriter:
+    """Encode BGR frames piped to ffmpeg, muxing the audio of the source video"""
+
+    def __init__(self, path, size, fps, profile, audio_source=None, audio_start=0.0, audio_duration=None,
+                 threads=None):
+        width, height = size
+        cmd = [
+            'ffmpeg', '-y', '-v', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24',
+            '-s', f'{width}x{height}', '-r', f'{fps}',
+            '-i', '-'
+        ]
+        self._concat_script = None
+        if audio_source:
+            # Cut the source audio to the exported range
+            if audio_start > 0:
+                cmd += ['-ss', f'{audio_start:.6f}']
+            if audio_duration is not None:
+                cmd += ['-t', f'{audio_duration:.6f}']
+            input_args, self._concat_script = ffmpeg_input_args(audio_source)
+            cmd += input_args + ['-map', '0:v:0', '-map', '1:a?', '-c:a', 'copy', '-shortest']
+        cmd += [
+            '-c:v', 'libx264',
+            '-preset', profile['preset'],
+            '-crf', str(profile['crf']),
+            '-pix_fmt', 'yuv420p',
+            '-movflags', '+faststart',
+        ]
+        if threads:
+            cmd += ['-threads', str(threads)]
+        cmd.append(path)
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    def isOpened(self):
+        return self.proc.poll() is None
+
+    def write(self, frame):
+        self.proc.stdin.write(np.ascontiguousarray(frame).data)
+
+    def release(self):
+        """Close the pipe and wait for the encoder, raising if ffmpeg failed"""
+        if not self.proc.stdin.closed:
+            self.proc.stdin.close()
+        returncode = self.proc.wait()
+        if self._concat_script and os.path.exists(self._concat_script):
+            os.remove(self._concat_script)
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg exited with code {returncode}")
+
+
+class FramePool:
+    """Bounded set of reusable frame buffers passed between the export stages"""
+
+    def __init__(self, size, count=FRAME_POOL_SIZE):
+        width, height = size
+        self._free = queue.Queue()
+        for _ in range(count):
+            self._free.put(np.empty((height, width, 3), np.uint8))
+
+    def acquire(self):
+        """Take a free buffer, blocking until a later stage returns one"""
+        return self._free.get()
+
+    def release(self, frame):
+        self._free.put(frame)
+
+
+def read_frame_into(reader, frame):
+    """Decode the next frame of a reader into a preallocated buffer, scaling if needed"""
+    ret, decoded = reader.read(frame)
+    if not ret:
+        return False
+    if decoded.ctypes.data != frame.ctypes.data:
+        # The source size differs from the buffer (OpenCV reader without scaling)
+        cv2.resize(decoded, (frame.shape[1], frame.shape[0]), dst=frame, interpolation=cv2.INTER_AREA)
+    return True
+
+
+def panel_reuse_text(stats):
+    """How many rendered frames reused the previous frame's panel, for status lines"""
+    panels = stats.get('panels_drawn', 0) + stats.get('panels_reused', 0)
+    if not panels:
+        return "no panels drawn"
+    return f"panel reused for {stats['panels_reused'] / panels:.0%} of frames"
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None where it can't be measured"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+
+def run_ffmpeg(cmd, max_frames, progress=None):
+    """Run an ffmpeg command that has '-progress pipe:1', reporting frames as they are encoded.
+
+    Returns the number of frames written; raises if ffmpeg fails.
+    """
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    frames = 0
+    try:
+        for line in proc.stdout:
+            key, _, value = line.strip().partition('=')
+            if key == 'frame':
+                frames = int(value)
+                if progress is not None:
+                    progress(min(frames, max_frames), max_frames)
+    except BaseException:
+        # Interrupted (e.g. the window was closed): don't leave ffmpeg writing in the background
+        proc.kill()
+        proc.wait()
+        raise
+    errors = proc.stderr.read()
+    if proc.wait() != 0:
+        raise RuntimeError(f"ffmpeg failed: {errors.strip()}")
+    return frames
+
+
+def video_properties(path):
+    """Return (width, height, fps, frame count) of a video file or list of chapters, as stored (before rotation)"""
+    cap = open_video(path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video file {path}")
+    properties = (
+        int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        cap.get(cv2.CAP_PROP_FPS),
+        int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+    )
+    cap.release()
+    return properties
+
+
+def export_frame_size(width, height, profile):
+    """Output size for an export profile, keeping aspect ratio and even dimensions.
+
+    The profile height is the short side, so portrait videos get the same
+    resolution as landscape ones; videos are never upscaled.
+    """
+    target = profile['height']
+    short_side = min(width, height)
+    if target is None or target >= short_side:
+        return width, height
+    scale = target / short_side
+    return int(round(width * scale / 2)) * 2, int(round(height * scale / 2)) * 2
+
+
+@functools.lru_cache(maxsize=32)
+def compile_panel_layout(metric_icons, width, height, graph_icons=()):
+    """Pre-render the static chrome of the metric panel for one frame size.
+
+    metric_icons and graph_icons are tuples of (metric or graph widget, icon)
+    pairs in display order; graphs get taller boxes below the metrics. Box
+    backgrounds, borders and icon prefixes are drawn once here, so per frame only
+    the chrome blend, the value text and the graph blits remain. Results are
+    cached per (metrics, graphs, resolution). Returns None if there is nothing to draw.
+    """
+    # Create base position and styling, scaled with the frame size
+    scale = min(height, width) / LAYOUT_REFERENCE_HEIGHT
+    margin = int(round(20 * scale))
+    box_height = int(round(38 * scale))  # smaller height
+    box_padding = int(round(10 * scale))  # smaller padding
+    box_spacing = max(1, int(round(2 * scale)))
+    fixed_width = int(round(180 * scale))  # smaller width
+    font_size = 0.55 * scale  # smaller font
+    font_thickness = max(1, int(round(scale)))  # thinner font
+    bg_color = (16, 16, 16)
+
+    boxes = [(metric, icon, box_height) for metric, icon in metric_icons]
+    boxes += [(widget, icon, 2 * box_height) for widget, icon in graph_icons]
+    panel_width = min(fixed_width + 1, width - margin)
+    panel_height = min(sum(h + box_spacing for _, _, h in boxes), height - margin)
+    if not boxes or panel_width <= 0 or panel_height <= 0:
+        return None
+
+    # Drawing on black gives colors premultiplied by coverage; the mask holds the coverage
+    canvas = np.zeros((panel_height, panel_width, 3), np.uint8)
+    mask = np.zeros((panel_height, panel_width), np.uint8)
+    slots = []
+    graphs = []
+    top = 0
+    for metric, icon, row_height in boxes:
+        pts = np.array([
+            [0, top],
+            [fixed_width, top],
+            [fixed_width, top + row_height],
+            [0, top + row_height]
+        ], np.int32)
+        cv2.fillPoly(canvas, [pts], bg_color)
+        cv2.fillPoly(mask, [pts], 255)
+        cv2.polylines(canvas, [pts], True, (64, 64, 64), 1, cv2.LINE_AA)
+        cv2.polylines(mask, [pts], True, 255, 1, cv2.LINE_AA)
+
+        # Left-align text with padding; the icon prefix is static
+        text_x = box_padding
+        text_y = int(top + (box_height * 0.7))
+        prefix = f"{icon} "
+        cv2.putText(canvas, prefix, (text_x, text_y), cv2.FONT_HERSHEY_SIMPLEX,
+                    font_size, (255, 255, 255), font_thickness, cv2.LINE_AA)
+        (prefix_width, _), _ = cv2.getTextSize(prefix, cv2.FONT_HERSHEY_SIMPLEX, font_size, font_thickness)
+        if row_height == box_height:
+            slots.append((metric, text_x + prefix_width, text_y))
+        else:
+            # The graph is plotted right of its label, inset from the box border
+            inset = max(1, box_padding // 2)
+            plot_x = text_x + prefix_width
+            plot_width = fixed_width - box_padding - plot_x
+            plot_height = row_height - 2 * inset
+            if plot_width > 1 and plot_height > 1 and top + row_height <= panel_height:
+                graphs.append((metric, plot_x, top + inset, plot_width, plot_height))
+        top += row_height + box_spacing
+
+    chrome = np.empty((panel_height, panel_width, 4), np.uint8)
+    chrome[..., :3] = np.rint(canvas * PANEL_ALPHA)
+    chrome[..., 3] = np.rint(mask * PANEL_ALPHA)
+    return PanelLayout(margin, margin, chrome, tuple(slots), tuple(graphs), font_size, font_thickness)
+
+
+def rasterize_graph_columns(times, values, column_times, height, color, value_range):
+    """Rasterize graph columns as premultiplied BGR plus coverage.
+
+    Column i shows the value at column_times[i + 1]; column_times has one extra
+    leading entry so each column can span from the previous value to its own,
+    which keeps the line connected without drawing line segments. Columns
+    without data (before the first sample or missing values) stay empty.
+    """
+    idx = np.searchsorted(times, column_times, side='right') - 1
+    column_values = np.where(idx >= 0, values[np.maximum(idx, 0)], np.nan)
+    low, high = value_range
+    y = (high - column_values) / (high - low) * (height - 1)
+    prev, cur = y[:-1], y[1:]
+    prev = np.where(np.isnan(prev), cur, prev)
+    rows = np.arange(height)[:, None]
+    coverage = (rows >= np.floor(np.fmin(prev, cur))) & (rows <= np.ceil(np.fmax(prev, cur)))
+    image = coverage[..., None] * np.rint(np.array(color) * PANEL_ALPHA).astype(np.uint8)
+    return image, coverage.astype(np.uint8) * 255
+
+
+def utc_offsets(times, timezone):
+    """UTC offset in ns of a timezone at each time (int64 ns since the epoch).
+
+    The offset is looked up once per distinct hour; the rare hours containing
+    a transition are resolved sample by sample.
+    """
+    hour = np.int64(3600 * 10**9)
+    hours, inverse = np.unique(times // hour, return_inverse=True)
+
+    def offset_at(ns):
+        moment = pytz.utc.localize(EPOCH + datetime.timedelta(microseconds=int(ns) // 1000))
+        return moment.astimezone(timezone).utcoffset() // datetime.timedelta(microseconds=1) * 1000
+
+    starts = np.array([offset_at(h * hour) for h in hours.tolist()], np.int64)
+    ends = np.array([offset_at((h + 1) * hour - 1) for h in hours.tolist()], np.int64)
+    offsets = starts[inverse]
+    for i in np.flatnonzero(starts != ends):
+        in_hour = np.flatnonzero(inverse == i)
+        offsets[in_hour] = [offset_at(t) for t in times[in_hour].tolist()]
+    return offsets
+
+
+# Key of missing values in display text columns
+_MISSING_KEY = np.iinfo(np.int64).min
+
+
+def _narrow_text(texts):
+    """Unicode array cast to the width of its longest text"""
+    width = int(np.strings.str_len(texts).max()) if len(texts) else 1
+    return texts.astype(f'<U{max(width, 1)}')
+
+
+def text_column(keys, format_keys):
+    """Text of every sample as (texts, codes): texts[codes[i]] is the text of sample i.
+
+    Each distinct int64 key is formatted once with format_keys(unique keys);
+    codes use the narrowest unsigned type for the number of texts.
+    """
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return _narrow_text(format_keys(unique)), inverse.astype(np.min_scalar_type(max(len(unique) - 1, 0)))
+
+
+def _with_unit(unique, unit, missing='--'):
+    return np.where(unique == _MISSING_KEY, missing, unique.astype(str) + unit)
+
+
+def clock_text_column(times, timezone):
+    """HH:MM:SS local time text column of times (int64 ns since the epoch)"""
+    seconds = ((times + utc_offsets(times, timezone)) // 10**9) % 86400
+
+    def format_keys(unique):
+        hours, minutes, seconds = (np.strings.zfill(part.astype(str), 2)
+                                   for part in (unique // 3600, unique // 60 % 60, unique % 60))
+        return hours + ':' + minutes + ':' + seconds
+
+    return text_column(seconds, format_keys)
+
+
+def pace_text_column(speed):
+    """M:SS /km text column of speeds in m/s; NaN shows as --, standing still as --:-- /km"""
+    speed_kmh = speed.astype(np.float64) * 3.6
+    moving = speed_kmh > 0
+    pace_per_km = 60 / np.where(moving, speed_kmh, 1.0)  # Calculate pace in minutes per km
+    minutes = np.trunc(pace_per_km)
+    seconds = np.trunc((pace_per_km - minutes) * 60)
+    keys = np.where(moving, minutes.astype(np.int64) * 60 + seconds.astype(np.int64),
+                    np.where(np.isnan(speed_kmh), _MISSING_KEY, -1))
+
+    def format_keys(unique):
+        text = (unique // 60).astype(str) + ':' + np.strings.zfill((unique % 60).astype(str), 2) + ' /km'
+        return np.where(unique == _MISSING_KEY, '--', np.where(unique < 0, '--:-- /km', text))
+
+    return text_column(keys, format_keys)
+
+
+def distance_text_column(distance):
+    """0.00km text column of distances in m, rounded like '%.2f'"""
+    km = distance.astype(np.float64) / 1000
+    cents = np.rint(km * 100)
+    # Scaling can move values next to a rounding tie across it; format those exactly
+    near_tie = np.abs(np.abs(km * 100 - np.trunc(km * 100)) - 0.5) < 1e-6
+    if near_tie.any():
+        exact = np.strings.mod('%.2f', km[near_tie])
+        cents[near_tie] = np.strings.replace(exact, '.', '').astype(np.int64)
+    keys = np.where(np.isnan(km), _MISSING_KEY, np.nan_to_num(cents).astype(np.int64))
+
+    def format_keys(unique):
+        whole = np.strings.add(np.where(unique < 0, '-', ''), (np.abs(unique) // 100).astype(str))
+        text = whole + '.' + np.strings.zfill((np.abs(unique) % 100).astype(str), 2) + 'km'
+        return np.where(unique == _MISSING_KEY, '--', text)
+
+    return text_column(keys, format_keys)
+
+
+def _truncated_keys(values):
+    return np.where(np.isnan(values), _MISSING_KEY, np.trunc(np.nan_to_num(values)).astype(np.int64))
+
+
+def display_string_table(data, timezone):
+    """Value text of every panel metric for every sample of a TelemetryStore.
+
+    The same text as OverlayRenderer.format_metric_values(), as a dict of
+    metric -> (texts, codes) pairs (see text_column()): every distinct text is
+    formatted once and stored at its own width, heart rate, cadence and
+    activity type index 256-entry tables with their uint8 codes directly.
+    Only the time column depends on the timezone. Missing values are --.
+    """
+    table = {}
+
+    lookup = np.full(256, '--', dtype=object)
+    lookup[:len(data.activity_types)] = [str(name) for name in data.activity_types]
+    table['activity_type'] = (_narrow_text(lookup.astype(str)), data['activity_type'])
+
+    table['time'] = clock_text_column(data['time'], timezone)
+
+    for metric, unit in (('heart_rate', ' BPM'), ('cadence', ' SPM')):
+        lookup = _with_unit(np.arange(256), unit)
+        lookup[data.MISSING] = '--'
+        table[metric] = (_narrow_text(lookup), data[metric])
+
+    # Cumulative averages from the prefix sums, as TelemetryStore.sample() computes them
+    averages = {}
+    for column in ('heart_rate', 'speed'):
+        count = data[f'{column}_count']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            averages[column] = np.where(count > 0, data[f'{column}_sum'] / count, np.nan)
+
+    table['speed'] = pace_text_column(data['speed'])
+    table['avg_speed'] = pace_text_column(averages['speed'])
+    table['avg_heart_rate'] = text_column(_truncated_keys(averages['heart_rate']),
+                                          lambda unique: _with_unit(unique, ' BPM'))
+    table['elevation'] = text_column(_truncated_keys(data['elevation'].astype(np.float64)),
+                                     lambda unique: _with_unit(unique, 'm'))
+    table['distance'] = distance_text_column(data['distance'])
+    return table
+
+
+def blend_premultiplied(roi, image, coverage):
+    """Draw a premultiplied image over roi in place"""
+    transparency = 255 - coverage[..., None].astype(np.uint16)
+    roi[:] = (roi * transparency + 127) // 255 + image
+
+
+class ProfileGraph:
+    """Graph of a channel over the whole activity with a cursor at the current time.
+
+    The profile is rasterized once; drawing it is a blit plus a cursor line.
+    """
+
+    def __init__(self, times, values, width, height, color, value_range):
+        self.start = times[0]
+        self.span = max(times[-1] - times[0], 1)
+        column_times = self.start + (np.arange(-1, width) + 0.5) * self.span / width
+        self.image, self.coverage = rasterize_graph_columns(times, values, column_times, height, color, value_range)
+
+    def draw(self, roi, time):
+        blend_premultiplied(roi, self.image, self.coverage)
+        x = int(np.clip((time - self.start) / self.span * roi.shape[1], 0, roi.shape[1] - 1))
+        roi[:, x] = round(255 * PANEL_ALPHA)
+
+
+class RollingGraph:
+    """Graph of a channel over the last window of time, scrolling with the video.
+
+    Columns are time buckets of window / width on a grid fixed to the activity
+    start and live in a ring buffer, so moving forward only rasterizes the new
+    buckets; seeking back or far ahead redraws the window. Drawing is a blit of
+    the two halves of the ring plus a cursor dot at the newest value.
+    """
+
+    def __init__(self, times, values, width, height, window, color, value_range):
+        self.times = times
+        self.values = values
+        self.height = height
+        self.width = width
+        self.color = color
+        self.value_range = value_range
+        self.start = times[0]
+        self.bucket = window / width
+        self.image = np.zeros((height, width, 3), np.uint8)
+        self.coverage = np.zeros((height, width), np.uint8)
+        self.newest = None  # Newest bucket in the ring
+
+    def update(self, time):
+        newest = int((time - self.start) // self.bucket)
+        if self.newest is not None and 0 <= newest - self.newest < self.width:
+            first = self.newest + 1  # Only the buckets that scrolled in
+        else:
+            first = newest - self.width + 1
+        if first <= newest:
+            column_times = self.start + np.arange(first - 1, newest + 1) * self.bucket
+            image, coverage = rasterize_graph_columns(self.times, self.values, column_times,
+                                                      self.height, self.color, self.value_range)
+            ring = np.arange(first, newest + 1) % self.width
+            self.image[:, ring] = image
+            self.coverage[:, ring] = coverage
+        self.newest = newest
+
+    def draw(self, roi, time):
+        self.update(time)
+        # Oldest bucket first: the ring from the slot after the newest bucket, then wrapped around
+        split = (self.newest + 1) % self.width
+        tail = self.width - split
+        blend_premultiplied(roi[:, :tail], self.image[:, split:], self.coverage[:, split:])
+        blend_premultiplied(roi[:, tail:], self.image[:, :split], self.coverage[:, :split])
+
+        idx = np.searchsorted(self.times, time, side='right') - 1
+        if idx >= 0 and not np.isnan(self.values[idx]):
+            low, high = self.value_range
+            y = int(round((high - self.values[idx]) / (high - low) * (self.height - 1)))
+            radius = max(1, self.height // 16)
+            color = tuple(round(c * PANEL_ALPHA) for c in self.color)
+            cv2.circle(roi, (self.width - 1 - radius, y), radius, color, -1, cv2.LINE_AA)
+
+
+def probe_video(path):
+    """Return (creation_time, duration) of a video file or list of chapters.
+
+    creation_time is a naive UTC datetime taken from the container tags, or None
+    if it is missing or ffprobe is not installed.
+    """
+    if isinstance(path, (list, tuple)):
+        # The recording starts with the first chapter and lasts for all of them
+        creation_time, duration = probe_video(path[0])
+        return creation_time, duration + sum(probe_video(chapter)[1] for chapter in path[1:])
+    try:
+        output = subprocess.check_output([
+            'ffprobe', '-v', 'error',
+            '-show_entries', 'format=duration:format_tags=creation_time',
+            '-of', 'json', path
+        ])
+        info = json.loads(output).get('format', {})
+        duration = float(info.get('duration', 0.0))
+        creation = info.get('tags', {}).get('creation_time')
+        if creation:
+            creation_time = datetime.datetime.fromisoformat(creation.replace('Z', '+00:00'))
+            if creation_time.tzinfo is not None:
+                creation_time = creation_time.astimezone(pytz.utc).replace(tzinfo=None)
+            return creation_time, duration
+        return None, duration
+    except Exception:
+        cap = cv2.VideoCapture(path)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        duration = cap.get(cv2.CAP_PROP_FRAME_COUNT) / fps if fps else 0.0
+        cap.release()
+        return None, duration
+
+
+class TelemetryStore:
+    """Typed columnar telemetry, filled sample by sample while parsing.
+
+    time is int64 nanoseconds since the epoch (UTC). Positions, elevation, speed
+    and distance are float32 with NaN when missing; heart rate and cadence are
+    uint8 with 255 (the FIT invalid value) when missing; activity types are uint8
+    codes into activity_types with 255 when missing. finish() trims the columns
+    and adds prefix sums so running averages are O(1) per frame.
+    """
+
+    FLOAT_COLUMNS = ('latitude', 'longitude', 'elevation', 'speed', 'distance')
+    UINT8_COLUMNS = ('heart_rate', 'cadence')
+    MISSING = 255
+
+    def __init__(self, capacity=4096):
+        self.columns = {'time': np.empty(capacity, np.int64), 'activity_type': np.empty(capacity, np.uint8)}
+        for column in self.FLOAT_COLUMNS:
+            self.columns[column] = np.empty(capacity, np.float32)
+        for column in self.UINT8_COLUMNS:
+            self.columns[column] = np.empty(capacity, np.uint8)
+        self.activity_types = []
+        self._activity_codes = {}
+        self._size = 0
+
+    @classmethod
+    def from_arrays(cls, arrays, activity_types):
+        """Wrap finished columns (e.g. attached from shared memory) without copying"""
+        store = cls(capacity=0)
+        store.columns = dict(arrays)
+        store.activity_types = list(activity_types)
+        store._activity_codes = {name: code for code, name in enumerate(store.activity_types)}
+        store._size = len(arrays['time'])
+        return store
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def append(self, time, latitude=np.nan, longitude=np.nan, elevation=np.nan, speed=np.nan,
+               distance=np.nan, heart_rate=None, cadence=None, activity_type=None):
+        """Add one sample; time is a naive UTC datetime, None values are stored as missing"""
+        i = self._size
+        if i == len(self.columns['time']):
+            self._grow()
+        columns = self.columns
+        columns['time'][i] = (time - EPOCH) // datetime.timedelta(microseconds=1) * 1000
+        columns['latitude'][i] = latitude
+        columns['longitude'][i] = longitude
+        columns['elevation'][i] = np.nan if elevation is None else elevation
+        columns['speed'][i] = np.nan if speed is None else speed
+        columns['distance'][i] = np.nan if distance is None else distance
+        columns['heart_rate'][i] = self.MISSING if heart_rate is None else min(int(heart_rate), 254)
+        columns['cadence'][i] = self.MISSING if cadence is None else min(int(cadence), 254)
+        if activity_type is None:
+            columns['activity_type'][i] = self.MISSING
+        else:
+            code = self._activity_codes.get(activity_type)
+            if code is None:
+                code = self._activity_codes[activity_type] = len(self.activity_types)
+                self.activity_types.append(str(activity_type))
+            columns['activity_type'][i] = code
+        self._size = i + 1
+
+    def extend(self, time, activity_type=None, **columns):
+        """Add many samples at once.
+
+        time is an int64 array of nanoseconds since the epoch; columns are arrays
+        in the store's dtypes (NaN / MISSING for missing values). Columns left out
+        are missing, activity_type is one name for all the samples.
+        """
+        n = len(time)
+        while self._size + n > len(self.columns['time']):
+            self._grow()
+        span = slice(self._size, self._size + n)
+        self.columns['time'][span] = time
+        for column in self.FLOAT_COLUMNS:
+            self.columns[column][span] = columns.get(column, np.nan)
+        for column in self.UINT8_COLUMNS:
+            self.columns[column][span] = columns.get(column, self.MISSING)
+        if activity_type is None:
+            self.columns['activity_type'][span] = self.MISSING
+        else:
+            code = self._activity_codes.get(activity_type)
+            if code is None:
+                code = self._activity_codes[activity_type] = len(self.activity_types)
+                self.activity_types.append(str(activity_type))
+            self.columns['activity_type'][span] = code
+        self._size += n
+
+    def _grow(self):
+        capacity = max(4096, 2 * len(self.columns['time']))
+        for column, values in self.columns.items():
+            grown = np.empty(capacity, values.dtype)
+            grown[:self._size] = values[:self._size]
+            self.columns[column] = grown
+
+    def finish(self):
+        """Trim to the number of samples and build the running-average prefix sums"""
+        columns = {column: values[:self._size].copy() for column, values in self.columns.items()}
+        for column, valid in (('heart_rate', columns['heart_rate'] != self.MISSING),
+                              ('speed', ~np.isnan(columns['speed']))):
+            columns[f'{column}_sum'] = np.cumsum(np.where(valid, columns[column], 0), dtype=np.float64)
+            columns[f'{column}_count'] = np.cumsum(valid, dtype=np.int32)
+        self.columns = columns
+        return self
+
+    def valid(self, column):
+        """Boolean mask of samples that have a value for column"""
+        values = self.columns[column]
+        if column in self.UINT8_COLUMNS or column == 'activity_type':
+            return values != self.MISSING
+        return ~np.isnan(values)
+
+    def sample(self, idx):
+        """Build the metrics dict for one sample; missing values are None"""
+        columns = self.columns
+        point = {'time': EPOCH + datetime.timedelta(microseconds=int(columns['time'][idx]) // 1000)}
+        for column in self.FLOAT_COLUMNS:
+            value = columns[column][idx]
+            point[column] = None if np.isnan(value) else float(value)
+        for column in self.UINT8_COLUMNS:
+            value = columns[column][idx]
+            point[column] = None if value == self.MISSING else int(value)
+        code = columns['activity_type'][idx]
+        point['activity_type'] = None if code == self.MISSING else self.activity_types[code]
+
+        # Cumulative averages for heart rate and speed from the prefix sums
+        for column in ('heart_rate', 'speed'):
+            count = columns[f'{column}_count'][idx]
+            point[f'avg_{column}'] = float(columns[f'{column}_sum'][idx] / count) if count else None
+
+        return point
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.columns.values())
+
+    def bytes_per_100k(self):
+        """Memory used by the columns, normalized to 100k samples"""
+        return self.nbytes / max(self._size, 1) * 100_000
+
+    def to_dataframe(self):
+        """Export a pandas DataFrame view of the samples (pandas is only needed for this)"""
+        import pandas as pd
+
+        data = {'time': pd.to_datetime(self.columns['time'][:self._size], unit='ns')}
+        for column in self.FLOAT_COLUMNS:
+            data[column] = self.columns[column][:self._size]
+        for column in self.UINT8_COLUMNS:
+            values = pd.array(self.columns[column][:self._size], dtype='UInt8')
+            values[~self.valid(column)[:self._size]] = pd.NA
+            data[column] = values
+        codes = self.columns['activity_type'][:self._size].astype(np.int16)
+        codes[codes == self.MISSING] = -1
+        data['activity_type'] = pd.Categorical.from_codes(codes, categories=self.activity_types)
+        return pd.DataFrame(data)
+
+
+def share_arrays(arrays):
+    """Copy a dict of numpy arrays into one shared memory block.
+
+    Returns the SharedMemory (the caller closes and unlinks it) and a picklable
+    descriptor for attach_shared_arrays() in worker processes.
+    """
+    layout = []
+    offset = 0
+    for name, array in arrays.items():
+        layout.append((name, array.shape, array.dtype.str, offset))
+        offset += (array.nbytes + 63) // 64 * 64  # Keep every array 64-byte aligned
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for name, shape, dtype, start in layout:
+        np.ndarray(shape, dtype, buffer=shm.buf, offset=start)[...] = arrays[name]
+    return shm, (shm.name, layout)
+
+
+def attach_shared_arrays(descriptor):
+    """Map the arrays of a share_arrays() descriptor without copying them"""
+    name, layout = descriptor
+    shm = shared_memory.SharedMemory(name=name)
+    arrays = {
+        array_name: np.ndarray(shape, dtype, buffer=shm.buf, offset=start)
+        for array_name, shape, dtype, start in layout
+    }
+    return shm, arrays
+
+
+def parse_fit_file(path, progress=None):
+    """Parse the record messages of a .fit file into a TelemetryStore.
+
+    progress(records, None) is called every few thousand records (the total
+    isn't known before the end of the file); it may raise to abort parsing.
+    """
+    from fitparse import FitFile
+
+    fitfile = FitFile(path)
+    store = TelemetryStore()
+
+    for count, record in enumerate(fitfile.get_messages('record'), 1):
+        if progress is not None and count % 5000 == 0:
+            progress(count, None)
+        values = record.get_values()
+        lat = values.get('position_lat')
+        lon = values.get('position_long')
+
+        # Records without position (e.g. from a watch without GPS) still carry the other channels
+        if values.get('timestamp') is None:
+            continue
+        has_position = lat is not None and lon is not None
+
+        store.append(
+            values.get('timestamp'),
+            # Convert semicircles to degrees
+            latitude=lat * 180.0 / 2**31 if has_position else np.nan,
+            longitude=lon * 180.0 / 2**31 if has_position else np.nan,
+            elevation=values.get('enhanced_altitude'),  # Prefer enhanced_altitude over altitude
+            speed=values.get('enhanced_speed'),  # Prefer enhanced_speed over speed, already in m/s
+            distance=values.get('distance'),
+            heart_rate=values.get('heart_rate'),
+            cadence=values.get('cadence'),
+            activity_type=values.get('activity_type'),
+        )
+
+    return store.finish()
+
+
+def segment_lengths(latitude, longitude, elevation=None):
+    """Haversine length in meters of each step of a track, including the climb when known"""
+    lat = np.radians(np.asarray(latitude, np.float64))
+    lon = np.radians(np.asarray(longitude, np.float64))
+    dlat = np.diff(lat)
+    dlon = np.diff(lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2) ** 2
+    lengths = 2 * 6371000 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))  # Earth radius in meters
+    if elevation is not None:
+        climb = np.nan_to_num(np.diff(np.asarray(elevation, np.float64)))
+        lengths = np.hypot(lengths, climb)
+    return lengths
+
+
+GPX_CHUNK_SIZE = 8 * 2**20
+
+
+def _gpx_field(points, raw, tag, end=b'<', width=32):
+    """Text after the first occurrence of tag in each point, up to end.
+
+    points is a fixed-width bytes array with one track point per entry and raw
+    its uint8 view; every point is searched at once. Missing fields are b''.
+    """
+    start = np.strings.find(points, tag)
+    found = start >= 0
+    start = np.where(found, start + len(tag), 0)
+    stop = np.strings.find(points, end, start)
+    stop = np.where(found & (stop >= 0), np.minimum(stop, start + width), start)
+    # Gather the field's bytes into a zero-padded (points, width) block and read it as strings
+    cols = start[:, None] + np.arange(width)
+    take = cols < stop[:, None]
+    rows = np.broadcast_to(np.arange(len(points))[:, None], cols.shape)
+    text = np.zeros((len(points), width), np.uint8)
+    text[take] = raw[rows[take], cols[take]]
+    return text.view(f'S{width}').ravel()
+
+
+def _gpx_numbers(text):
+    """Field texts to float64, NaN where the field is missing"""
+    text = np.char.strip(text)
+    text[text == b''] = b'nan'
+    return text.astype(np.float64)
+
+
+def _gpx_times(text):
+    """ISO 8601 GPX timestamps to int64 nanoseconds since the epoch (UTC)"""
+    text = np.char.strip(text)
+    if np.char.endswith(text, b'Z').all():
+        # The common case: numpy parses UTC timestamps in one call
+        return np.char.rstrip(text, b'Z').astype('datetime64[ns]').astype(np.int64)
+    times = np.empty(len(text), np.int64)
+    for i, value in enumerate(text):
+        dt = datetime.datetime.fromisoformat(value.decode().replace('Z', '+00:00'))
+        if dt.tzinfo is not None:
+            dt = dt.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        times[i] = (dt - EPOCH) // datetime.timedelta(microseconds=1) * 1000
+    return times
+
+
+def _missing_to_uint8(values):
+    """Float values with NaN to the uint8 columns of TelemetryStore"""
+    return np.where(np.isnan(values), TelemetryStore.MISSING, np.clip(values, 0, 254)).astype(np.uint8)
+
+
+def parse_gpx_file(path, progress=None):
+    """Parse the track points of a .gpx file into a TelemetryStore.
+
+    The file is read in chunks that are cut at track point boundaries. Each
+    chunk is split into one string per track point and every field is pulled
+    out of all points with numpy string operations, so no element tree (or
+    Python object per point) is built. Heart rate and cadence come from the
+    Garmin TrackPointExtension; speed and distance are derived from the positions.
+    progress(bytes read, file size) is called after every chunk and may raise
+    to abort parsing.
+    """
+    size = os.path.getsize(path)
+    chunks = []
+    activity_type = None
+    pending = b''
+    header = True
+
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(GPX_CHUNK_SIZE)
+            pending += chunk
+            # Only complete points are parsed; the rest waits for the next chunk
+            cut = pending.rfind(b'</trkpt>') if chunk else len(pending)
+            if cut < 0:
+                continue
+            block, pending = pending[:cut], pending[cut:]
+
+            if header:
+                # Before the first point: metadata, waypoints, and the track's name and type
+                first = block.find(b'<trkpt')
+                if first < 0:
+                    break
+                track = max(block.rfind(b'<trk>', 0, first), block.rfind(b'<trk ', 0, first))
+                type_start = block.find(b'<type>', track, first) if track >= 0 else -1
+                if type_start >= 0:
+                    type_end = block.find(b'<', type_start + 6)
+                    activity_type = block[type_start + 6:type_end].decode().strip() or None
+                block = block[first:]
+                header = False
+
+            # Attribute quotes may be either kind; normalize so lat/lon parse the same way
+            points = block.replace(b"'", b'"').split(b'</trkpt>')
+            if not chunk:
+                points = points[:-1]  # The closing tags of the track and file
+            points = np.array([point for point in points if b'<trkpt' in point])
+            if len(points):
+                raw = points.view(np.uint8).reshape(len(points), -1)
+                times = _gpx_field(points, raw, b'<time>')
+                has_time = np.char.strip(times) != b''  # Points without a timestamp can't be synced to the video
+                chunks.append({
+                    'time': _gpx_times(times[has_time]),
+                    'latitude': _gpx_numbers(_gpx_field(points, raw, b'lat="', b'"'))[has_time],
+                    'longitude': _gpx_numbers(_gpx_field(points, raw, b'lon="', b'"'))[has_time],
+                    'elevation': _gpx_numbers(_gpx_field(points, raw, b'<ele>'))[has_time],
+                    'heart_rate': _missing_to_uint8(_gpx_numbers(_gpx_field(points, raw, b'hr>'))[has_time]),
+                    'cadence': _missing_to_uint8(_gpx_numbers(_gpx_field(points, raw, b'cad>'))[has_time]),
+                })
+            if not chunk:
+                break
+            if progress is not None:
+                progress(f.tell(), size)
+
+    columns = {name: np.concatenate([c[name] for c in chunks]) for name in chunks[0]} if chunks else {}
+    store = TelemetryStore(capacity=len(columns.get('time', ())))
+    if len(store.columns['time']):
+        # Speed and distance from the haversine length of each step (in float64, before storing)
+        lengths = segment_lengths(columns['latitude'], columns['longitude'], columns['elevation'])
+        elapsed = np.diff(columns['time']) / 1e9
+        columns['speed'] = np.zeros(len(columns['time']))
+        np.divide(lengths, elapsed, out=columns['speed'][1:], where=elapsed > 0)  # First point has no speed
+        columns['distance'] = np.concatenate([[0.0], np.cumsum(lengths)])
+        store.extend(activity_type=activity_type, **columns)
+    return store.finish()
+
+
+def parse_activity_file(path, progress=None):
+    """Parse a .fit or .gpx file, chosen by extension, into a TelemetryStore"""
+    if path.lower().endswith('.gpx'):
+        return parse_gpx_file(path, progress)
+    return parse_fit_file(path, progress)
+
+
+def align_channel(times, values, timeline, interpolate=True, tolerance=MERGE_TOLERANCE_SECONDS):
+    """Resample one channel of one source onto a timeline, NaN where it has no data.
+
+    Between two valid samples at most tolerance apart the value is interpolated
+    (or the nearest one is taken); otherwise the nearest sample is used if it is
+    within tolerance, so gaps in a source stay gaps.
+    """
+    valid = ~np.isnan(values)
+    times, values = times[valid], values[valid]
+    aligned = np.full(len(timeline), np.nan)
+    if not len(times):
+        return aligned
+    tolerance = int(tolerance * 1e9)
+
+    right = np.minimum(np.searchsorted(times, timeline), len(times) - 1)
+    left = np.maximum(right - 1, 0)
+    left_gap = np.abs(timeline - times[left])
+    right_gap = np.abs(times[right] - timeline)
+    nearest = np.where(left_gap <= right_gap, left, right)
+    aligned = np.where(np.minimum(left_gap, right_gap) <= tolerance, values[nearest], np.nan)
+
+    if interpolate:
+        between = (times[left] <= timeline) & (timeline <= times[right]) & (times[right] - times[left] <= tolerance)
+        # Interpolate in seconds relative to the first sample to keep float precision
+        origin = times[0]
+        interpolated = np.interp((timeline - origin) / 1e9, (times - origin) / 1e9, values)
+        aligned = np.where(between, interpolated, aligned)
+    return aligned
+
+
+def continued_distance(distance):
+    """Distance where every restart (a drop below half of the previous value) continues from the previous total"""
+    last_valid = np.maximum.accumulate(np.where(np.isnan(distance), 0, np.arange(len(distance))))
+    previous = np.r_[np.nan, distance[last_valid][:-1]]  # Latest distance before each sample
+    restart = distance < previous * 0.5
+    return distance + np.cumsum(np.where(restart, previous, 0.0))
+
+
+def merge_telemetry(stores, priority=None):
+    """Merge the telemetry of several devices or files into one timeline.
+
+    The timeline is the sorted union of all sample times. Every channel is
+    aligned from each source with align_channel() and taken from the first
+    source in priority order that has a value; priority maps a channel to a list
+    of source indices, by default the sources with the most samples of that
+    channel come first.
+
+    Distance counts from the start of each device, so it is only merged within
+    one chain of sources that follow each other in time (e.g. a device
+    restarted into a new file), where restarts continue from the previous
+    total. Overlapping devices with their own origin only fill in when they
+    belong to the chain of the preferred source.
+    """
+    stores = [store for store in stores if len(store)]
+    if len(stores) == 1:
+        return stores[0]
+    if not stores:
+        return TelemetryStore().finish()
+    priority = priority or {}
+
+    # Chain every source to the latest-ending chain that ended before it starts
+    starts = [int(store['time'][0]) for store in stores]
+    chains = []
+    chain_of = [None] * len(stores)
+    for i in sorted(range(len(stores)), key=starts.__getitem__):
+        ends = [int(stores[chain[-1]]['time'][-1]) for chain in chains]
+        earlier = [c for c, end in enumerate(ends) if end <= starts[i]]
+        chain_of[i] = max(earlier, key=ends.__getitem__) if earlier else len(chains)
+        if not earlier:
+            chains.append([])
+        chains[chain_of[i]].append(i)
+    distances = [None] * len(stores)
+    for chain in chains:
+        values = [np.where(stores[i].valid('distance'), stores[i]['distance'], np.nan) for i in chain]
+        continued = np.split(continued_distance(np.concatenate(values).astype(np.float64)),
+                             np.cumsum([len(v) for v in values])[:-1])
+        for i, distance in zip(chain, continued):
+            distances[i] = distance
+
+    timeline = np.unique(np.concatenate([store['time'] for store in stores]))
+    columns = {'time': timeline}
+    for column in TelemetryStore.FLOAT_COLUMNS + TelemetryStore.UINT8_COLUMNS + ('activity_type',):
+        order = priority.get(column) or sorted(
+            range(len(stores)), key=lambda i: -int(np.count_nonzero(stores[i].valid(column))))
+        if column == 'distance':
+            order = [i for i in order if chain_of[i] == chain_of[order[0]]]
+        merged = np.full(len(timeline), np.nan)
+        for i in order:
+            missing = np.isnan(merged)
+            if not missing.any():
+                break
+            store = stores[i]
+            if column == 'distance':
+                values = distances[i]
+            else:
+                values = np.where(store.valid(column), store[column], np.nan)
+            if column == 'activity_type':
+                # Categories can't be interpolated; tag the nearest code with its source
+                aligned = align_channel(store['time'], values, timeline, interpolate=False) + 1000 * i
+            else:
+                aligned = align_channel(store['time'], values, timeline)
+            merged[missing] = aligned[missing]
+        columns[column] = merged
+
+    for column in TelemetryStore.UINT8_COLUMNS:
+        values = columns[column]
+        columns[column] = np.where(np.isnan(values), TelemetryStore.MISSING,
+                                   np.clip(np.rint(values), 0, 254)).astype(np.uint8)
+    for column in TelemetryStore.FLOAT_COLUMNS:
+        columns[column] = columns[column].astype(np.float32)
+
+    # Activity type codes (source * 1000 + code) to the merged store's categories
+    activity_types = []
+    codes = np.full(len(timeline), TelemetryStore.MISSING, np.uint8)
+    source_codes = columns.pop('activity_type')
+    for value in np.unique(source_codes[~np.isnan(source_codes)]):
+        source, code = divmod(int(value), 1000)
+        name = stores[source].activity_types[code]
+        if name not in activity_types:
+            activity_types.append(name)
+        codes[source_codes == value] = activity_types.index(name)
+    columns['activity_type'] = codes
+
+    return TelemetryStore.from_arrays(columns, activity_types).finish()
+
+
+# Progress queue of parse_activity_files() worker processes
+_parse_messages = None
+
+
+def _init_parse_worker(messages):
+    global _parse_messages
+    _parse_messages = messages
+
+
+def _parse_reporting(i, path):
+    return parse_activity_file(path, lambda done, total: _parse_messages.put((i, done, total)))
+
+
+def parse_activity_files(paths, priority=None, progress=None):
+    """Parse one or more .fit/.gpx files (in parallel) and merge them into one TelemetryStore.
+
+    progress is passed on for a single file; for several it is called as
+    progress(files done, file count) while the workers report, with parts of
+    files whose size is known (GPX) counted as fractions. If progress raises,
+    the worker processes are terminated right away.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    if len(paths) == 1:
+        return parse_activity_file(paths[0], progress)
+    messages = multiprocessing.Queue()
+    fractions = [0.0] * len(paths)
+    reported = None
+    # Leaving the block, also when progress raises to cancel, terminates the workers
+    with multiprocessing.Pool(min(len(paths), os.cpu_count() or 1), _init_parse_worker, (messages,)) as pool:
+        results = [pool.apply_async(_parse_reporting, (i, path)) for i, path in enumerate(paths)]
+        while not all(result.ready() for result in results):
+            try:
+                i, done, total = messages.get(timeout=0.1)
+                if total:
+                    fractions[i] = done / total
+            except queue.Empty:
+                pass
+            for i, result in enumerate(results):
+                if result.ready():
+                    fractions[i] = 1.0
+            if progress is not None and sum(fractions) != reported:
+                reported = sum(fractions)
+                progress(reported, len(paths))
+        stores = [result.get() for result in results]
+    return merge_telemetry(stores, priority)
+
+
+def render_route_map(route_points, size):
+    """Draw the route line on a transparent square image.
+
+    Returns (RGBA image of size x size, (min_lat, max_lat, min_lon, max_lon)
+    bounds of the image). Uses a Figure of its own rather than pyplot, so it
+    is safe to call from a worker thread.
+    """
+    # Create a new figure with black background
+    fig = Figure(figsize=(8, 8), facecolor='black')
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.set_facecolor('black')
+    ax.set_axis_off()
+
+    # Get route bounds
+    lats, lons = zip(*route_points)
+    min_lat, max_lat = min(lats), max(lats)
+    min_lon, max_lon = min(lons), max(lons)
+
+    # Add some padding
+    lat_pad = (max_lat - min_lat) * 0.1
+    lon_pad = (max_lon - min_lon) * 0.1
+    min_lat -= lat_pad
+    max_lat += lat_pad
+    min_lon -= lon_pad
+    max_lon += lon_pad
+
+    ax.set_ylim(min_lat, max_lat)
+    ax.set_xlim(min_lon, max_lon)
+
+    # Plot the route line with bright white color
+    ax.plot(lons, lats, color='white', linewidth=5, alpha=1.0, solid_capstyle='round')
+
+    # Convert to numpy array with transparent background
+    canvas.draw()
+    rgba = np.asarray(canvas.buffer_rgba())
+
+    # Resize to desired size
+    image = cv2.resize(rgba, (size, size), interpolation=cv2.INTER_AREA)
+    return image, (min_lat, max_lat, min_lon, max_lon)
+
+
+class OverlayRenderer:
+    """Telemetry lookup and overlay drawing, independent of the Tk GUI"""
+
+    def __init__(self):
+        self.gpx_data = None  # TelemetryStore of the loaded activity
         self.overlay_settings = {
             'heart_rate': True,
             'speed': True,
@@ -45,16 +1434,20 @@ class GPXVideoOverlay:
             'time': True,
             'activity_type': True,
             'avg_heart_rate': True,
-            'avg_speed': True  # Retain only relevant fields
+            'avg_speed': True,  # Retain only relevant fields
+            'hr_graph': False,
+            'speed_graph': False,
+            'elevation_profile': False,
         }
+        self.graph_window_seconds = 300  # Span of the scrolling graphs, None for the whole activity
+        self._graphs = {}  # Rasterized graphs by (widget, plot size, window)
+        self._panel_memo = (None, None, None, None)  # (key, layout, tile, transparency) of the last panel
+        self.panel_stats = {'drawn': 0, 'reused': 0}  # Panels rendered vs. reused from the previous frame
+        self._display_strings = (None, None)  # (timezone, text of every metric for every sample)
         
         self.gpx_start_offset = 0  # Offset in seconds
         self.metrics_display_format = 'text'  # Only text option available
-        self.rotate_180 = tk.BooleanVar(value=False)  # Add variable for rotation
         self.timezone = pytz.timezone("Europe/Berlin")  # Default timezone
-        self.available_timezones = sorted(pytz.all_timezones)
-        self._fields_dirty = False  # Track if any field was changed
-        self.preview_playing = False  # Add this line to track preview state
         self.map_size = 300  # Size of the map overlay
         self.route_points = None  # Store route points for map
         self.map_img = None  # Store the map image
@@ -73,15 +1466,865 @@ class GPXVideoOverlay:
             'time': 'TME ',
             'avg_heart_rate': 'AHR ',
             'avg_speed': 'ASP ',
-            'activity_type': 'ACT '  # Add icon for activity type
+            'activity_type': 'ACT ',  # Add icon for activity type
+            'hr_graph': 'HR  ',
+            'speed_graph': 'SPD ',
+            'elevation_profile': 'ALT ',
         }
+        self.available_metrics = set()  # Metrics the loaded activity has data for
+
+    def set_telemetry(self, data):
+        """Use a parsed TelemetryStore for rendering and prepare the route map"""
+        self.apply_telemetry(self.prepare_telemetry(data, self.timezone))
+
+    def prepare_telemetry(self, data, timezone=None):
+        """Work set_telemetry() does for a store, without changing the renderer.
+
+        Draws the route map and, given a timezone, builds the panel text table.
+        Safe to run in a worker thread while this renderer keeps drawing the
+        previous activity; apply_telemetry() then swaps the result in.
+        """
+        prepared = {'data': data, 'route_points': None, 'map_img': None, 'map_bounds': None,
+                    'display_strings': (None, None)}
+
+        # After loading FIT data, prepare route points for map
+        has_position = data.valid('latitude') & data.valid('longitude') if len(data) else None
+        if len(data) and has_position.any():
+            prepared['route_points'] = list(zip(
+                data['latitude'][has_position].tolist(),
+                data['longitude'][has_position].tolist()
+            ))
+            prepared['map_img'], prepared['map_bounds'] = render_route_map(prepared['route_points'], self.map_size)
+        if timezone is not None and len(data):
+            prepared['display_strings'] = (timezone.zone, display_string_table(data, timezone))
+        return prepared
+
+    def apply_telemetry(self, prepared):
+        """Switch to the activity of a prepare_telemetry() result"""
+        self.gpx_data = prepared['data']
+        self._graphs = {}
+        self._panel_memo = (None, None, None, None)
+        self._display_strings = prepared['display_strings']
+        self._update_available_metrics()
+        self.route_points = prepared['route_points']
+        self.map_img = prepared['map_img']
+        if prepared['map_bounds'] is not None:
+            self.min_lat, self.max_lat, self.min_lon, self.max_lon = prepared['map_bounds']
+
+    def _update_available_metrics(self):
+        data = self.gpx_data
+        self.available_metrics = {
+            metric for metric, channel in METRIC_CHANNELS.items()
+            if len(data) and (channel == 'time' or data.valid(channel).any())
+        }
+        self.available_metrics.update(
+            widget for widget, (channel, _, _) in GRAPH_WIDGETS.items()
+            if len(data) > 1 and data.valid(channel).any()
+        )
+
+    def telemetry_start(self):
+        """Time of the first telemetry sample as a naive UTC datetime"""
+        return EPOCH + datetime.timedelta(microseconds=int(self.gpx_data['time'][0]) // 1000)
+
+    def shared_state(self):
+        """Arrays and settings needed to render in another process.
+
+        The arrays (telemetry, prefix sums, display text and map raster) are
+        meant to be placed in shared memory with share_arrays(); the settings
+        dict is small and picklable.
+        """
+        arrays = dict(self.gpx_data.columns)
+        if self.map_img is not None:
+            arrays['map_img'] = self.map_img
+        for metric, (texts, codes) in self.display_strings().items():
+            arrays[f'text_{metric}'] = texts
+            arrays[f'text_codes_{metric}'] = codes
+        config = {
+            'overlay_settings': dict(self.overlay_settings),
+            'timezone': self.timezone.zone,
+            'graph_window_seconds': self.graph_window_seconds,
+            'activity_types': list(self.gpx_data.activity_types),
+            'map_bounds': (self.min_lat, self.max_lat, self.min_lon, self.max_lon),
+        }
+        return arrays, config
+
+    def load_shared_state(self, arrays, config):
+        """Counterpart of shared_state(): render from arrays attached in this process"""
+        arrays = dict(arrays)
+        self.map_img = arrays.pop('map_img', None)
+        table = {}
+        for name in [name for name in arrays if name.startswith('text_codes_')]:
+            metric = name[len('text_codes_'):]
+            table[metric] = (arrays.pop(f'text_{metric}'), arrays.pop(name))
+        self.gpx_data = TelemetryStore.from_arrays(arrays, config['activity_types'])
+        self._graphs = {}
+        self._panel_memo = (None, None, None, None)
+        self._display_strings = (config['timezone'], table or None)
+        self._update_available_metrics()
+        self.overlay_settings.update(config['overlay_settings'])
+        self.timezone = pytz.timezone(config['timezone'])
+        self.graph_window_seconds = config['graph_window_seconds']
+        self.min_lat, self.max_lat, self.min_lon, self.max_lon = config['map_bounds']
+
+    def latlon_to_pixels(self, lat, lon):
+        """Convert latitude/longitude to pixel coordinates on map"""
+        # Normalize to 0-1
+        if self.max_lon == self.min_lon or self.max_lat == self.min_lat:
+            return 0, 0  # Avoid division by zero
+        x_norm = (lon - self.min_lon) / (self.max_lon - self.min_lon)
+        y_norm = (lat - self.min_lat) / (self.max_lat - self.min_lat)
+        # Convert to pixel coordinates (invert y for image coordinates)
+        x = int(x_norm * (self.map_size - 1))
+        y = int((1 - y_norm) * (self.map_size - 1))
+        # Clamp to image bounds
+        x = max(0, min(self.map_size - 1, x))
+        y = max(0, min(self.map_size - 1, y))
+        return x, y
+
+    def get_gpx_data_at_time(self, video_time):
+        """Get GPX data at the given video time, accounting for offset"""
+        if self.gpx_data is None or len(self.gpx_data) == 0:
+            return None
+        
+        idx = self.get_sample_indices(np.array([video_time]))[0]
+        if idx < 0:
+            # Before GPX data starts
+            return None
+
+        return self.gpx_data.sample(idx)
+
+    def get_sample_indices(self, video_times):
+        """Closest telemetry sample for each video time (seconds), -1 before the data starts"""
+        times = self.gpx_data['time']
+        
+        # Adjusted time with offset, relative to the start of the GPX data
+        adjusted_times = np.asarray(video_times, np.float64) + self.gpx_start_offset
+        target_times = times[0] + (adjusted_times * 1e9).astype(np.int64)
+        
+        # Find closest time in GPX data
+        idx = np.minimum(np.searchsorted(times, target_times), len(times) - 1)
+        prev_idx = np.maximum(idx - 1, 0)
+
+        # Check if previous point is closer
+        use_prev = (idx > 0) & (target_times <= times[-1]) & (
+            (target_times - times[prev_idx]) < (times[idx] - target_times))
+        idx = np.where(use_prev, prev_idx, idx)
+        idx[adjusted_times < 0] = -1
+        return idx
+    
+    def get_panel_layout(self, width, height):
+        """Compiled panel layout for the enabled metrics (cached per settings and size)"""
+        metric_icons = tuple(
+            (metric, self.ICONS[metric]) for metric in PANEL_METRICS
+            if self.overlay_settings.get(metric) and metric in self.available_metrics
+        )
+        graph_icons = tuple(
+            (widget, self.ICONS[widget]) for widget in GRAPH_WIDGETS
+            if self.overlay_settings.get(widget) and widget in self.available_metrics
+        )
+        return compile_panel_layout(metric_icons, width, height, graph_icons)
+
+    def get_graph(self, widget, width, height):
+        """Graph of a widget for one plot size, rasterized on first use"""
+        window = self.graph_window_seconds if GRAPH_WIDGETS[widget][2] else None
+        key = (widget, width, height, window)
+        graph = self._graphs.get(key)
+        if graph is None:
+            channel, color, _ = GRAPH_WIDGETS[widget]
+            data = self.gpx_data
+            values = np.where(data.valid(channel), data[channel], np.nan).astype(np.float32)
+            # Scale to the whole activity so rolling graphs never need redrawing for a new range
+            low, high = float(np.nanmin(values)), float(np.nanmax(values))
+            pad = max((high - low) * 0.1, 1.0)
+            value_range = (low - pad, high + pad)
+            if window is None:
+                graph = ProfileGraph(data['time'], values, width, height, color, value_range)
+            else:
+                graph = RollingGraph(data['time'], values, width, height, int(window * 1e9), color, value_range)
+            self._graphs[key] = graph
+        return graph
+
+    def format_metric_values(self, gpx_point):
+        """Value text of every panel metric for one sample; missing values show as --"""
+        values = {}
+
+        if gpx_point.get('activity_type') is not None:
+            values['activity_type'] = str(gpx_point['activity_type'])
+
+        gpx_time = gpx_point['time']
+        if gpx_time.tzinfo is None:
+            gpx_time = pytz.utc.localize(gpx_time)
+        local_time = gpx_time.astimezone(self.timezone)
+        values['time'] = local_time.strftime('%H:%M:%S')
+
+        if gpx_point.get('heart_rate') is not None:
+            values['heart_rate'] = f"{int(gpx_point['heart_rate'])} BPM"
+
+        for metric in ('speed', 'avg_speed'):
+            if gpx_point.get(metric) is not None:
+                speed_kmh = gpx_point[metric] * 3.6
+                if speed_kmh > 0:
+                    pace_per_km = 60 / speed_kmh  # Calculate pace in minutes per km
+                    minutes = int(pace_per_km)
+                    seconds = int((pace_per_km - minutes) * 60)
+                    values[metric] = f"{minutes}:{seconds:02d} /km"
+                else:
+                    values[metric] = "--:-- /km"
+
+        if gpx_point.get('avg_heart_rate') is not None:
+            values['avg_heart_rate'] = f"{int(gpx_point['avg_heart_rate'])} BPM"
+
+        if gpx_point.get('cadence') is not None:
+            values['cadence'] = f"{int(gpx_point['cadence'])} SPM"
+
+        if gpx_point.get('elevation') is not None:
+            values['elevation'] = f"{int(gpx_point['elevation'])}m"
+
+        if gpx_point.get('distance') is not None:
+            distance_km = gpx_point['distance'] / 1000
+            values['distance'] = f"{distance_km:.2f}km"
+
+        return values
+
+    def display_strings(self):
+        """Value text of every panel metric for every sample, as (texts, codes) pairs.
+
+        Built by display_string_table() for the whole activity at once, so
+        drawing a panel only looks its text up; a timezone change rebuilds the
+        time column only.
+        """
+        zone, table = self._display_strings
+        if table is None:
+            table = display_string_table(self.gpx_data, self.timezone)
+        elif zone != self.timezone.zone:
+            table = dict(table, time=clock_text_column(self.gpx_data['time'], self.timezone))
+        self._display_strings = (self.timezone.zone, table)
+        return table
+
+    def render_panel(self, idx, layout):
+        """Premultiplied BGR panel for sample idx, its text looked up in display_strings()"""
+        values = {metric: texts[codes[idx]] for metric, (texts, codes) in self.display_strings().items()}
+        return self.draw_panel(values, int(self.gpx_data['time'][idx]), layout)
+
+    def draw_panel(self, values, time, layout):
+        """Value text and graphs (at time, ns) drawn onto a copy of the chrome"""
+        panel = layout.chrome[..., :3].copy()
+        text_color = (round(255 * PANEL_ALPHA),) * 3
+        for metric, text_x, text_y in layout.slots:
+            cv2.putText(panel, values.get(metric, '--'), (text_x, text_y), cv2.FONT_HERSHEY_SIMPLEX,
+                        layout.font_size, text_color, layout.font_thickness, cv2.LINE_AA)
+
+        for widget, x, y, width, height in layout.graphs:
+            self.get_graph(widget, width, height).draw(panel[y:y + height, x:x + width], time)
+        return panel
+
+    def get_panel_tile(self, idx, layout):
+        """(tile, transparency) of the panel for sample idx, reused while the sample stays the same.
+
+        Telemetry is usually 1 Hz against 30-60 fps video, so most frames show
+        the same sample as the frame before; those get the previous tile back
+        and only need the blend. Everything else the panel depends on is part
+        of the key: the layout (enabled metrics and frame size), timezone and
+        graph window.
+        """
+        key = (idx, self.timezone.zone, self.graph_window_seconds)
+        memo_key, memo_layout, tile, transparency = self._panel_memo
+        if memo_layout is layout and key == memo_key:
+            self.panel_stats['reused'] += 1
+            return tile, transparency
+        tile = self.render_panel(idx, layout)
+        if memo_layout is not layout:
+            transparency = 255 - layout.chrome[..., 3:].astype(np.uint16)
+        self._panel_memo = (key, layout, tile, transparency)
+        self.panel_stats['drawn'] += 1
+        return tile, transparency
+
+    def blend_panel(self, frame, layout, tile, transparency, inplace=False):
+        """Blend a panel tile onto the frame (premultiplied "over")"""
+        overlay = frame if inplace else frame.copy()
+        tile_h, tile_w = tile.shape[:2]
+        roi = overlay[layout.y:layout.y + tile_h, layout.x:layout.x + tile_w]
+        roi[:] = (roi * transparency + 127) // 255 + tile
+        return overlay
+
+    def create_overlay_image(self, frame, gpx_point, inplace=False):
+        """Create overlay image with metrics in F1-style (drawn into frame itself if inplace)"""
+        if gpx_point is None:
+            return frame
+
+        h, w = frame.shape[:2]
+        layout = self.get_panel_layout(w, h)
+        if layout is None:
+            return frame
+
+        time = (gpx_point['time'] - EPOCH) // datetime.timedelta(microseconds=1) * 1000
+        tile = self.draw_panel(self.format_metric_values(gpx_point), time, layout)
+        transparency = 255 - layout.chrome[..., 3:].astype(np.uint16)
+        return self.blend_panel(frame, layout, tile, transparency, inplace)
+
+    def overlay_frame(self, frame, video_time, inplace=False):
+        """Like create_overlay_image() for the sample at a video time, reusing the previous panel if unchanged"""
+        if self.gpx_data is None or len(self.gpx_data) == 0:
+            return frame
+        idx = self.get_sample_indices(np.array([video_time]))[0]
+        if idx < 0:
+            return frame  # Before the data starts
+
+        h, w = frame.shape[:2]
+        layout = self.get_panel_layout(w, h)
+        if layout is None:
+            return frame
+
+        tile, transparency = self.get_panel_tile(idx, layout)
+        return self.blend_panel(frame, layout, tile, transparency, inplace)
+
+    def render_video(self, video_path, output_path, profile, start_frame=0, end_frame=None,
+                     rotate=False, progress=None, threads=None, audio=True):
+        """Render the overlay onto frames [start_frame, end_frame) of a video.
+
+        progress(done, total) is called after every frame; audio=False leaves out
+        the source audio. The container's rotation metadata (plus 180° if rotate)
+        is applied by the decoder, so the overlay is drawn on upright frames and
+        the output needs no display matrix. Frames go through a
+        bounded pool of reusable buffers: a decode thread fills them in place, this
+        thread draws the overlay in place, and an encode thread writes
+        them out and returns them to the pool, so memory stays flat regardless of
+        the video length. Returns {'frames', 'panels_drawn', 'panels_reused',
+        'peak_rss_mb'}, panels_reused counting the frames that reused the
+        previous frame's panel; raises on failure.
+        """
+        width, height, fps, total_frames = video_properties(video_path)
+        rotation = video_orientation(video_path, rotate)
+        if rotation in (90, 270):
+            width, height = height, width
+
+        # Only the selected range is decoded and encoded
+        if end_frame is None:
+            end_frame = total_frames
+        max_frames = end_frame - start_frame
+        start_time = start_frame / fps
+        duration = max_frames / fps
+
+        # Draft/standard profiles downscale; the overlay layout scales with the output
+        out_size = export_frame_size(width, height, profile)
+
+        if ffmpeg_available():
+            # ffmpeg scales while decoding and encodes directly with the original audio
+            # ffmpeg also rotates while decoding, so frames arrive upright
+            reader = FFmpegFrameReader(video_path, out_size, fast_decode=profile['fast_decode'],
+                                       start_time=start_time, frame_count=max_frames, threads=threads,
+                                       rotation=rotation)
+            out = FFmpegFrameWriter(output_path, out_size, fps, profile, audio_source=video_path if audio else None,
+                                    audio_start=start_time, audio_duration=duration, threads=threads)
+        else:
+            reader = open_video(video_path)
+            reader.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+            if rotation:
+                reader = OrientedCapture(reader, rotation)
+            out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, out_size)
+
+        if not out.isOpened():
+            reader.release()
+            raise RuntimeError("Could not create output video writer")
+
+        pool = FramePool(out_size)
+        decoded = queue.Queue()
+        encoded = queue.Queue()
+        stop = threading.Event()
+        errors = []
+
+        def decode():
+            # Frames are read sequentially: seeking on every frame forces a decode from the last keyframe
+            try:
+                for _ in range(max_frames):
+                    frame = pool.acquire()
+                    if stop.is_set() or not read_frame_into(reader, frame):
+                        pool.release(frame)
+                        break
+                    decoded.put(frame)
+            except Exception as e:
+                if not stop.is_set():
+                    errors.append(e)
+            finally:
+                decoded.put(None)
+
+        def encode():
+            while (frame := encoded.get()) is not None:
+                try:
+                    if not errors:
+                        out.write(frame)
+                except Exception as e:
+                    errors.append(e)
+                # Keep returning buffers after an error so the other stages never block
+                pool.release(frame)
+
+        decode_thread = threading.Thread(target=decode, daemon=True)
+        encode_thread = threading.Thread(target=encode, daemon=True)
+        decode_thread.start()
+        encode_thread.start()
 
-        # Try to load a modern font, fallback to default if not available
+        frame_idx = 0
+        drawn_before, reused_before = self.panel_stats['drawn'], self.panel_stats['reused']
         try:
-            import cv2.freetype
-            self.has_custom_font = True
-        except:
-            self.has_custom_font = False
+            while not errors and (frame := decoded.get()) is not None:
+                # Telemetry is looked up by the frame's time in the source video
+                self.overlay_frame(frame, (start_frame + frame_idx) / fps, inplace=True)
+                encoded.put(frame)
+                frame_idx += 1
+                if progress is not None:
+                    progress(frame_idx, max_frames)
+        finally:
+            encoded.put(None)
+            encode_thread.join()
+            stop.set()
+            # Unblock the decoder if it is waiting for a buffer
+            while decode_thread.is_alive():
+                try:
+                    frame = decoded.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if frame is not None:
+                    pool.release(frame)
+            reader.release()
+            try:
+                out.release()
+            except Exception as e:
+                errors.append(e)
+
+        if errors:
+            raise errors[0]
+
+        return {'frames': frame_idx, 'panels_drawn': self.panel_stats['drawn'] - drawn_before,
+                'panels_reused': self.panel_stats['reused'] - reused_before, 'peak_rss_mb': peak_rss_mb()}
+
+    def write_overlay_tiles(self, directory, size, fps, start_frame, frame_count, premultiplied=True):
+        """Render one panel tile per run of output frames showing the same sample.
+
+        Tiles are RGBA PNGs (premultiplied alpha unless premultiplied=False),
+        written to directory together with an ffconcat script that times them to
+        the output frames. Returns (script path, (x, y) tile position, tile
+        count), or None if no panel is shown.
+        """
+        layout = self.get_panel_layout(*size)
+        if layout is None:
+            return None
+
+        frame_times = (start_frame + np.arange(frame_count)) / fps
+        indices = self.get_sample_indices(frame_times)
+        # First frame of every run of frames that show the same sample
+        starts = np.flatnonzero(np.r_[True, indices[1:] != indices[:-1]])
+        ends = np.r_[starts[1:], frame_count]
+
+        cv2.imwrite(os.path.join(directory, 'blank.png'), np.zeros_like(layout.chrome))
+        lines = ['ffconcat version 1.0']
+        for n, (start, end) in enumerate(zip(starts, ends)):
+            idx = indices[start]
+            if idx < 0:
+                name = 'blank.png'  # Before the data starts
+            else:
+                tile = layout.chrome.copy()
+                tile[..., :3] = self.render_panel(idx, layout)
+                if not premultiplied:
+                    alpha = np.maximum(tile[..., 3:], 1).astype(np.uint16)
+                    tile[..., :3] = np.minimum(tile[..., :3].astype(np.uint16) * 255 // alpha, 255)
+                name = f'tile_{n:06d}.png'
+                cv2.imwrite(os.path.join(directory, name), tile)
+            lines += [f"file '{name}'", f"duration {end / fps - start / fps:.6f}"]
+        # The concat demuxer only applies the last duration if the file is listed again
+        lines.append(f"file '{name}'")
+
+        script = os.path.join(directory, 'tiles.ffconcat')
+        with open(script, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        return script, (layout.x, layout.y), len(starts)
+
+    def render_video_filtergraph(self, video_path, output_path, profile, start_frame=0, end_frame=None,
+                                 rotate=False, progress=None, threads=None, audio=True):
+        """Like render_video(), but ffmpeg decodes, overlays and encodes.
+
+        Python only renders the small panel tiles (one per telemetry change, see
+        write_overlay_tiles()); ffmpeg composites them with its overlay filter, so
+        no full frame passes through Python. Requires ffmpeg.
+        """
+        if not ffmpeg_available():
+            raise RuntimeError("The ffmpeg export backend requires ffmpeg")
+
+        width, height, fps, total_frames = video_properties(video_path)
+        rotation = video_orientation(video_path, rotate)
+        if rotation in (90, 270):
+            width, height = height, width
+        if end_frame is None:
+            end_frame = total_frames
+        max_frames = end_frame - start_frame
+        out_size = export_frame_size(width, height, profile)
+
+        with tempfile.TemporaryDirectory() as tile_dir:
+            tiles = self.write_overlay_tiles(tile_dir, out_size, fps, start_frame, max_frames)
+
+            cmd = ['ffmpeg', '-y', '-v', 'error', '-nostats', '-progress', 'pipe:1']
+            if threads:
+                cmd += ['-threads', str(threads)]
+            if profile['fast_decode']:
+                cmd += ['-skip_loop_filter', 'all', '-flags2', 'fast']
+            if start_frame > 0:
+                cmd += ['-ss', f'{start_frame / fps:.6f}']
+            input_args, concat_script = ffmpeg_input_args(video_path)
+            cmd += ['-t', f'{max_frames / fps:.6f}', '-noautorotate'] + input_args
+
+            # Rotate and scale the source first so the panel is drawn upright at output size
+            filters = []
+            if rotation:
+                filters.append(ROTATION_FILTERS[rotation])
+            if out_size != (width, height):
+                filters.append(f'scale={out_size[0]}:{out_size[1]}')
+            base_filters = ','.join(filters) or 'null'
+            if tiles is not None:
+                script, (x, y), _ = tiles
+                cmd += ['-f', 'concat', '-safe', '0', '-i', script]
+                graph = (f'[0:v]{base_filters}[base];'
+                         f'[base][1:v]overlay=x={x}:y={y}:alpha=premultiplied:eof_action=repeat[v]')
+            else:
+                graph = f'[0:v]{base_filters}[v]'
+
+            cmd += ['-filter_complex', graph, '-map', '[v]']
+            if audio:
+                cmd += ['-map', '0:a?', '-c:a', 'copy']
+            cmd += [
+                '-frames:v', str(max_frames),
+                '-c:v', 'libx264',
+                '-preset', profile['preset'],
+                '-crf', str(profile['crf']),
+                '-pix_fmt', 'yuv420p',
+                '-movflags', '+faststart',
+            ]
+            if threads:
+                cmd += ['-threads', str(threads)]
+            cmd.append(output_path)
+
+            try:
+                frames = run_ffmpeg(cmd, max_frames, progress)
+            finally:
+                if concat_script:
+                    os.remove(concat_script)
+
+        # One tile is drawn per run of frames showing the same sample
+        drawn = tiles[2] if tiles is not None else 0
+        return {'frames': frames, 'panels_drawn': drawn, 'panels_reused': max(frames - drawn, 0) if drawn else 0,
+                'peak_rss_mb': peak_rss_mb()}
+
+    def render_settings_hash(self, video_path, profile, start_frame, end_frame, rotate, backend, segment_frames):
+        """Fingerprint of everything that affects the rendered frames of an export"""
+        videos = video_path if isinstance(video_path, (list, tuple)) else [video_path]
+        settings = {
+            'videos': [(os.path.abspath(path), os.path.getsize(path), os.path.getmtime(path)) for path in videos],
+            'profile': profile,
+            'range': (start_frame, end_frame),
+            'rotate': bool(rotate),
+            'backend': backend,
+            'segment_frames': segment_frames,
+            'offset': self.gpx_start_offset,
+            'timezone': self.timezone.zone,
+            'overlay_settings': self.overlay_settings,
+            'graph_window_seconds': self.graph_window_seconds,
+        }
+        digest = hashlib.sha256(json.dumps(settings, sort_keys=True).encode())
+        for column in sorted(self.gpx_data.columns):
+            digest.update(np.ascontiguousarray(self.gpx_data[column]).data)
+        return digest.hexdigest()
+
+    def render_resumable(self, video_path, output_path, profile, start_frame=0, end_frame=None,
+                         rotate=False, progress=None, threads=None, backend='python'):
+        """Render like render_video() in segments that survive an interruption.
+
+        Segments of SEGMENT_SECONDS are rendered without audio into
+        <output_path>.segments/ next to a manifest.json holding the settings hash,
+        the offset and the completed frame ranges. Running the same export again
+        skips the completed segments; a change of any setting starts over. The
+        segments are joined with the source audio by a stream copy, so the output
+        is not re-encoded, and the segment directory is removed afterwards.
+        Without ffmpeg this falls back to a single render_video() pass.
+        Returns {'frames', 'resumed_frames', 'panels_drawn', 'panels_reused',
+        'peak_rss_mb'}; the panel counts cover the frames rendered in this run.
+        """
+        render = self.render_video_filtergraph if backend == 'ffmpeg' else self.render_video
+        if not ffmpeg_available():
+            stats = render(video_path, output_path, profile, start_frame, end_frame,
+                           rotate=rotate, progress=progress, threads=threads)
+            stats['resumed_frames'] = 0
+            return stats
+
+        width, height, fps, total_frames = video_properties(video_path)
+        if end_frame is None:
+            end_frame = total_frames
+        total = end_frame - start_frame
+        segment_frames = max(1, int(round(SEGMENT_SECONDS * fps)))
+        segments = [(start, min(start + segment_frames, end_frame))
+                    for start in range(start_frame, end_frame, segment_frames)]
+
+        segment_dir = output_path + '.segments'
+        manifest_path = os.path.join(segment_dir, 'manifest.json')
+        settings_hash = self.render_settings_hash(video_path, profile, start_frame, end_frame,
+                                                  rotate, backend, segment_frames)
+        manifest = None
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get('settings_hash') != settings_hash:
+                shutil.rmtree(segment_dir)  # Rendered with other settings, start over
+                manifest = None
+        if manifest is None:
+            manifest = {
+                'settings_hash': settings_hash,
+                'offset': self.gpx_start_offset,
+                'frame_range': [start_frame, end_frame],
+                'segment_frames': segment_frames,
+                'completed': [],
+            }
+        os.makedirs(segment_dir, exist_ok=True)
+
+        completed = {tuple(frames) for frames in manifest['completed']}
+        names = [os.path.join(segment_dir, f'segment_{i:05d}.mp4') for i in range(len(segments))]
+        resumed = sum(end - start for (start, end), name in zip(segments, names)
+                      if (start, end) in completed and os.path.exists(name))
+        done = resumed
+        drawn = reused = 0
+        for (start, end), name in zip(segments, names):
+            if (start, end) in completed and os.path.exists(name):
+                continue
+
+            def on_progress(frame_idx, _, offset=done):
+                if progress:
+                    progress(offset + frame_idx, total)
+
+            # Rendered under a temporary name so a crash never leaves a truncated segment behind
+            part = name[:-len('.mp4')] + '.part.mp4'
+            stats = render(video_path, part, profile, start, end, rotate=rotate,
+                           progress=on_progress, threads=threads, audio=False)
+            drawn += stats['panels_drawn']
+            reused += stats['panels_reused']
+            os.replace(part, name)
+            completed.add((start, end))
+            manifest['completed'] = sorted(completed)
+            with open(manifest_path + '.tmp', 'w') as f:
+                json.dump(manifest, f)
+            os.replace(manifest_path + '.tmp', manifest_path)
+            done += end - start
+
+        # Join the segments without re-encoding and add the audio of the range
+        script = os.path.join(segment_dir, 'segments.ffconcat')
+        with open(script, 'w') as f:
+            f.write('ffconcat version 1.0\n')
+            f.writelines(f"file '{os.path.basename(name)}'\n" for name in names)
+        cmd = ['ffmpeg', '-y', '-v', 'error', '-f', 'concat', '-safe', '0', '-i', script]
+        if start_frame > 0:
+            cmd += ['-ss', f'{start_frame / fps:.6f}']
+        input_args, concat_script = ffmpeg_input_args(video_path)
+        cmd += ['-t', f'{total / fps:.6f}'] + input_args
+        cmd += ['-map', '0:v:0', '-map', '1:a?', '-c', 'copy', '-movflags', '+faststart', output_path]
+        try:
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        finally:
+            if concat_script:
+                os.remove(concat_script)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg could not join the segments: {result.stderr.decode(errors='replace').strip()}")
+
+        shutil.rmtree(segment_dir)
+        return {'frames': total, 'resumed_frames': resumed, 'panels_drawn': drawn, 'panels_reused': reused,
+                'peak_rss_mb': peak_rss_mb()}
+
+    def render_overlay_track(self, video_path, output_path, start_frame=0, end_frame=None,
+                             codec='qtrle', progress=None):
+        """Export only the overlay on a transparent canvas, for compositing in an editor.
+
+        The track matches the video's resolution and frame rate (and the
+        [start_frame, end_frame) range) but the video itself is never decoded.
+        One tile is rendered per telemetry change and ffmpeg pads it to the
+        full canvas and repeats it up to the frame rate. Requires ffmpeg.
+        """
+        if not ffmpeg_available():
+            raise RuntimeError("Overlay-only export requires ffmpeg")
+
+        width, height, fps, total_frames = video_properties(video_path)
+        if video_rotation(video_path) in (90, 270):
+            width, height = height, width  # The track matches the video as players show it
+        if end_frame is None:
+            end_frame = total_frames
+        max_frames = end_frame - start_frame
+
+        with tempfile.TemporaryDirectory() as tile_dir:
+            tiles = self.write_overlay_tiles(tile_dir, (width, height), fps, start_frame, max_frames,
+                                             premultiplied=False)
+            if tiles is None:
+                raise RuntimeError("No metrics are enabled")
+            script, (x, y), _ = tiles
+
+            cmd = [
+                'ffmpeg', '-y', '-v', 'error', '-nostats', '-progress', 'pipe:1',
+                '-f', 'concat', '-safe', '0', '-i', script,
+                '-vf', f'format=rgba,pad={width}:{height}:{x}:{y}:color=black@0,fps={fps}',
+                '-frames:v', str(max_frames),
+            ]
+            cmd += OVERLAY_CODECS[codec]
+            cmd.append(output_path)
+            frames = run_ffmpeg(cmd, max_frames, progress)
+
+        return {'frames': frames, 'peak_rss_mb': peak_rss_mb()}
+
+
+# Per-process state of batch render workers, set up once by _init_batch_worker
+_batch_worker = {}
+
+
+def _init_batch_worker(descriptor, config):
+    """Attach the shared telemetry and map once per worker process"""
+    shm, arrays = attach_shared_arrays(descriptor)
+    renderer = OverlayRenderer()
+    renderer.load_shared_state(arrays, config)
+    cv2.setNumThreads(config['threads'])
+    _batch_worker.update(shm=shm, renderer=renderer, config=config)
+
+
+def _render_batch_clip(clip):
+    renderer = _batch_worker['renderer']
+    config = _batch_worker['config']
+    renderer.gpx_start_offset = clip['offset']
+    return renderer.render_resumable(clip['video'], clip['output'], EXPORT_PROFILES[config['profile']],
+                                     rotate=config['rotate_180'], threads=config['threads'],
+                                     backend=config['backend'])
+
+
+def run_batch(spec_path):
+    """Render many clips of one activity from a JSON job spec.
+
+    Example spec (relative paths are resolved against the spec's directory):
+
+        {
+            "fit": ["race_bike.fit", "race_watch.fit"],
+            "clips": [
+                {"video": "GX010001.MP4"},
+                {"video": "GX010002.MP4", "output": "out/second.mp4", "offset": 754.2},
+                {"video": ["GX010003.MP4", "GX020003.MP4"]}
+            ],
+            "profile": "standard",
+            "backend": "python",
+            "timezone": "Europe/Berlin",
+            "rotate_180": false,
+            "overlay_settings": {"cadence": false, "hr_graph": true},
+            "graph_window_seconds": 300,
+            "priority": {"heart_rate": [1, 0]},
+            "clock_offset": 0.0,
+            "cpu_budget": 8
+        }
+
+    "fit" is one activity file or several to merge by timestamp, with an
+    optional per-channel source priority (indices into the list). A clip's
+    offset defaults to its container creation time minus the activity start
+    (plus clock_offset for a camera clock that is off). The activity is
+    parsed and the route map rendered once; the resulting arrays are shared with
+    the worker processes through shared memory. Returns the number of failed clips.
+    """
+    with open(spec_path) as f:
+        spec = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(spec_path))
+
+    renderer = OverlayRenderer()
+    renderer.overlay_settings.update(spec.get('overlay_settings', {}))
+    renderer.timezone = pytz.timezone(spec.get('timezone', 'Europe/Berlin'))
+    renderer.graph_window_seconds = spec.get('graph_window_seconds', renderer.graph_window_seconds)
+    # "fit" is one activity file or a list of them to merge (e.g. watch and bike computer)
+    activity_files = spec['fit'] if isinstance(spec['fit'], list) else [spec['fit']]
+    renderer.set_telemetry(parse_activity_files([os.path.join(base_dir, path) for path in activity_files],
+                                                spec.get('priority')))
+    if len(renderer.gpx_data) == 0:
+        raise ValueError(f"No records with a timestamp in {spec['fit']}")
+    telemetry_start = renderer.telemetry_start()
+
+    clips = []
+    for clip in spec['clips']:
+        # A clip is a file or a list of chapter files of one recording
+        chapters = clip['video'] if isinstance(clip['video'], list) else [clip['video']]
+        video = [os.path.join(base_dir, chapter) for chapter in chapters]
+        video = video if len(video) > 1 else video[0]
+        output = os.path.join(base_dir, clip.get('output') or os.path.splitext(chapters[0])[0] + '_overlay.mp4')
+        if clip.get('offset') is not None:
+            offset = float(clip['offset'])
+        else:
+            creation_time, _ = probe_video(video)
+            if creation_time is None:
+                raise ValueError(f"{chapters[0]} has no creation time, set 'offset' for it in the job spec")
+            offset = (creation_time - telemetry_start).total_seconds() + spec.get('clock_offset', 0.0)
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        clips.append({'video': video, 'output': output, 'offset': offset})
+
+    # Split the CPU budget between concurrent clips and the ffmpeg threads of each clip
+    cpu_budget = int(spec.get('cpu_budget') or os.cpu_count() or 1)
+    workers = max(1, min(len(clips), int(spec.get('workers') or cpu_budget // 4 or 1)))
+    arrays, config = renderer.shared_state()
+    config.update(
+        profile=spec.get('profile', 'standard'),
+        backend=spec.get('backend', 'python'),
+        rotate_180=bool(spec.get('rotate_180', False)),
+        threads=max(1, cpu_budget // workers),
+    )
+
+    shm, descriptor = share_arrays(arrays)
+    failures = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                 initargs=(descriptor, config)) as pool:
+            futures = {pool.submit(_render_batch_clip, clip): clip for clip in clips}
+            for future in as_completed(futures):
+                clip = futures[future]
+                try:
+                    stats = future.result()
+                    print(f"Rendered {clip['output']} ({stats['frames']} frames, offset {clip['offset']:.1f} s, "
+                          f"{panel_reuse_text(stats)})")
+                except Exception as e:
+                    failures += 1
+                    print(f"Failed to render {clip['output']}: {e}")
+    finally:
+        shm.close()
+        shm.unlink()
+    return failures
+
+
+class GPXVideoOverlay(OverlayRenderer):
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Garmin .FIT Video Overlay")  # Rename the tool
+        
+        # Make window open in full screen
+        screen_width = root.winfo_screenwidth()
+        screen_height = root.winfo_screenheight()
+        self.root.geometry(f"{screen_width}x{screen_height}")
+
+        super().__init__()
+        
+        # Variables
+        self.video_path = None
+        self.gpx_path = None
+        self.output_path = None
+        self.video_cap = None
+        self.current_frame = None
+        self.current_frame_idx = 0
+        self.total_frames = 0
+        self.video_fps = 0
+        self.video_duration = 0
+        self.rotate_180 = tk.BooleanVar(value=False)  # Add variable for rotation
+        self.available_timezones = sorted(pytz.all_timezones)
+        self._fields_dirty = False  # Track if any field was changed
+        self.preview_playing = False  # Add this line to track preview state
+        self._display_buffer = None  # Reused for drawing the preview frame
+        self.video_rotation = 0  # Clockwise rotation from the video's metadata
+        self.range_in = None  # Export range in/out frames (None = whole video)
+        self.range_out = None
+
+        # Files are loaded in the background; results are swapped in on the Tk thread
+        self._loader = ThreadPoolExecutor(max_workers=2, thread_name_prefix='loader')
+        self._loads = {}  # 'video' / 'activity' -> (future, cancel event) of the running load
+        self._load_messages = queue.Queue()  # (cancel event, status text) from the loaders
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         self.play_icon = "▶"    # Unicode play symbol
         self.pause_icon = "⏸"   # Unicode pause symbol
@@ -105,13 +2348,15 @@ class GPXVideoOverlay:
         self.video_label = ttk.Label(file_frame, text="No video selected")
         self.video_label.pack(fill=tk.X, pady=2)
         
-        ttk.Button(file_frame, text="Select FIT File", command=self.select_fit).pack(fill=tk.X, pady=2)  # Rename button
+        ttk.Button(file_frame, text="Select FIT/GPX File", command=self.select_fit).pack(fill=tk.X, pady=2)
         self.gpx_label = ttk.Label(file_frame, text="No FIT file selected")  # Update label
         self.gpx_label.pack(fill=tk.X, pady=2)
         
         ttk.Button(file_frame, text="Set Output", command=self.select_output).pack(fill=tk.X, pady=2)
         self.output_label = ttk.Label(file_frame, text="No output selected")
         self.output_label.pack(fill=tk.X, pady=2)
+
+        ttk.Button(file_frame, text="Cancel Loading", command=self.cancel_loading).pack(fill=tk.X, pady=2)
         
         # Sync Section
         sync_frame = ttk.LabelFrame(self.left_frame, text="Sync Settings", padding=10)
@@ -167,7 +2412,8 @@ class GPXVideoOverlay:
         
         # Metrics to display checkbuttons
         metrics = ['Heart Rate', 'Speed', 'Cadence', 'Elevation', 'Distance', 'Time',
-                   'Activity Type', 'Avg Heart Rate', 'Avg Speed']  # Removed 'Map'
+                   'Activity Type', 'Avg Heart Rate', 'Avg Speed',  # Removed 'Map'
+                   'HR Graph', 'Speed Graph', 'Elevation Profile']
         self.metrics_vars = {}
 
         # --- FIX: Ensure overlay_settings and checkboxes are in sync ---
@@ -186,18 +2432,54 @@ class GPXVideoOverlay:
             ).pack(anchor=tk.W)
         # --------------------------------------------------------------
 
+        # Time span of the HR and speed graphs
+        ttk.Label(settings_frame, text="Graph span:").pack(anchor=tk.W, pady=(5, 0))
+        self.graph_window_var = tk.StringVar(value='5 min')
+        graph_window_combo = ttk.Combobox(
+            settings_frame, textvariable=self.graph_window_var,
+            values=list(GRAPH_WINDOWS), state='readonly'
+        )
+        graph_window_combo.pack(fill=tk.X, pady=2)
+        graph_window_combo.bind("<<ComboboxSelected>>", self._on_graph_window_change)
+
         # Add rotate 180° checkbox
         ttk.Checkbutton(
             settings_frame, text="Rotate 180°", variable=self.rotate_180,
             command=self._on_field_change
         ).pack(anchor=tk.W, pady=(5, 0))
         
+        # Export Settings Section
+        export_frame = ttk.LabelFrame(self.left_frame, text="Export Settings", padding=10)
+        export_frame.pack(fill=tk.X, pady=5)
+
+        ttk.Label(export_frame, text="Profile:").pack(anchor=tk.W)
+        self.export_profile_var = tk.StringVar(value='master')
+        ttk.Combobox(
+            export_frame, textvariable=self.export_profile_var,
+            values=list(EXPORT_PROFILES), state='readonly'
+        ).pack(fill=tk.X, pady=2)
+
+        ttk.Label(export_frame, text="Compositing:").pack(anchor=tk.W)
+        self.export_backend_var = tk.StringVar(value='python')
+        ttk.Combobox(
+            export_frame, textvariable=self.export_backend_var,
+            values=EXPORT_BACKENDS, state='readonly'
+        ).pack(fill=tk.X, pady=2)
+
+        ttk.Label(export_frame, text="Overlay-only codec:").pack(anchor=tk.W)
+        self.overlay_codec_var = tk.StringVar(value='qtrle')
+        ttk.Combobox(
+            export_frame, textvariable=self.overlay_codec_var,
+            values=list(OVERLAY_CODECS), state='readonly'
+        ).pack(fill=tk.X, pady=2)
+
         # Action buttons
         action_frame = ttk.Frame(self.left_frame)
         action_frame.pack(fill=tk.X, pady=10)
         
         ttk.Button(action_frame, text="Preview", command=self.preview_overlay).pack(side=tk.LEFT, padx=5)
         ttk.Button(action_frame, text="Export Video", command=self.export_video).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(action_frame, text="Export Overlay Only", command=self.export_overlay_track).pack(side=tk.RIGHT, padx=5)
         
         # Status bar (moved below action buttons)
         self.status_var = tk.StringVar(value="Ready")
@@ -258,6 +2540,13 @@ class GPXVideoOverlay:
         # Create a label for current time / total time
         self.time_label = ttk.Label(controls_frame, text="00:00 / 00:00")
         self.time_label.pack(side=tk.LEFT, padx=5)
+
+        # In/out points for exporting only part of the video
+        ttk.Button(controls_frame, text="Set In", command=self.set_range_in).pack(side=tk.LEFT, padx=(15, 2))
+        ttk.Button(controls_frame, text="Set Out", command=self.set_range_out).pack(side=tk.LEFT, padx=2)
+        ttk.Button(controls_frame, text="Clear", command=self.clear_range).pack(side=tk.LEFT, padx=2)
+        self.range_label = ttk.Label(controls_frame, text="Range: full video")
+        self.range_label.pack(side=tk.LEFT, padx=5)
         
         ttk.Label(controls_frame, text="").pack(side=tk.LEFT, expand=True)  # Spacer
     
@@ -275,6 +2564,11 @@ class GPXVideoOverlay:
         if self.preview_playing:
             self.stop_preview()
 
+    def _on_graph_window_change(self, event=None):
+        """Update the span of the scrolling graphs when another one is selected."""
+        self.graph_window_seconds = GRAPH_WINDOWS[self.graph_window_var.get()]
+        self._on_field_change()
+
     def stop_preview(self):
         """Stop video playback and reset to beginning"""
         self.pause_preview()  # First pause the playback
@@ -336,6 +2630,7 @@ class GPXVideoOverlay:
         # Overlay checkboxes
         for metric, var in self.metrics_vars.items():
             self.overlay_settings[metric] = var.get()
+        self.graph_window_seconds = GRAPH_WINDOWS[self.graph_window_var.get()]
         # Display format
         self.metrics_display_format = 'text'
         # Rotation
@@ -351,27 +2646,70 @@ class GPXVideoOverlay:
             self.timezone_var.set("Europe/Berlin")
         self._fields_dirty = False
 
+    def set_range_in(self):
+        """Use the current frame as the start of the export range"""
+        if self.video_cap is None:
+            return
+        self.range_in = self.current_frame_idx
+        if self.range_out is not None and self.range_out <= self.range_in:
+            self.range_out = None
+        self._update_range_label()
+
+    def set_range_out(self):
+        """Use the current frame as the end (exclusive) of the export range"""
+        if self.video_cap is None:
+            return
+        self.range_out = self.current_frame_idx + 1
+        if self.range_in is not None and self.range_in >= self.range_out:
+            self.range_in = None
+        self._update_range_label()
+
+    def clear_range(self):
+        """Export the whole video again"""
+        self.range_in = None
+        self.range_out = None
+        self._update_range_label()
+
+    def _update_range_label(self):
+        if self.range_in is None and self.range_out is None:
+            self.range_label.config(text="Range: full video")
+            return
+        start_frame, end_frame = self.get_export_range()
+        start_time = start_frame / self.video_fps
+        end_time = end_frame / self.video_fps
+        self.range_label.config(
+            text=f"Range: {int(start_time//60):02d}:{start_time%60:04.1f} - "
+                 f"{int(end_time//60):02d}:{end_time%60:04.1f}"
+        )
+
+    def get_export_range(self):
+        """Return the (start, end) frames to export, end exclusive"""
+        start_frame = self.range_in if self.range_in is not None else 0
+        end_frame = self.range_out if self.range_out is not None else self.total_frames
+        return max(0, start_frame), min(self.total_frames, end_frame)
+
     def select_video(self):
-        path = filedialog.askopenfilename(filetypes=[
+        # Selecting several files treats them as chapters of one recording, in name order
+        paths = filedialog.askopenfilenames(filetypes=[
             ("Video files", "*.mp4 *.avi *.mov *.mkv"),
             ("All files", "*.*")
         ])
         
-        if path:
-            self.video_path = path
-            self.video_label.config(text=os.path.basename(path))
-            self.load_video()
+        if paths:
+            paths = sorted(paths)
+            self.load_video(paths[0] if len(paths) == 1 else paths)
     
     def select_fit(self):
-        path = filedialog.askopenfilename(filetypes=[
-            ("FIT files", "*.fit"),  # Only allow .fit files
+        # Several files (e.g. watch and bike computer, or a split activity) are merged by timestamp
+        paths = filedialog.askopenfilenames(filetypes=[
+            ("Activity files", "*.fit *.gpx"),
+            ("FIT files", "*.fit"),
+            ("GPX files", "*.gpx"),
             ("All files", "*.*")
         ])
         
-        if path:
-            self.gpx_path = path
-            self.gpx_label.config(text=os.path.basename(path))
-            self.load_fit_file()  # Directly call load_fit_file
+        if paths:
+            self.load_fit_file(paths[0] if len(paths) == 1 else list(paths))
     
     def select_output(self):
         path = filedialog.asksaveasfilename(defaultextension=".mp4",
@@ -381,284 +2719,196 @@ class GPXVideoOverlay:
             self.output_path = path
             self.output_label.config(text=os.path.basename(path))
     
-    def load_video(self):
-        if self.video_path:
-            cap = cv2.VideoCapture(self.video_path)
-            if cap.isOpened():
-                self.video_cap = cap
-                self.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                self.video_fps = cap.get(cv2.CAP_PROP_FPS)
-                self.video_duration = self.total_frames / self.video_fps
-                
-                self.timeline.config(to=self.total_frames - 1)
-                
-                # Load first frame
-                ret, frame = cap.read()
-                if ret:
-                    self.current_frame = frame
-                    self.current_frame_idx = 0
-                    self.display_frame()
-                
-                self.status_var.set(f"Video loaded: {self.total_frames} frames, {self.video_duration:.2f} seconds")
+    def load_video(self, path=None):
+        """Open and probe a video (or chapter list) in the background; the current one stays until it is ready"""
+        self._start_load('video', self._read_video, path if path is not None else self.video_path)
+
+    def load_gpx(self, path=None):
+        """Load and parse .gpx track data (same columns as a .fit file)"""
+        self.load_fit_file(path)
+
+    def load_fit_file(self, path=None):
+        """Load and parse .fit (or .gpx) files in the background; the current activity stays until they are ready"""
+        self._start_load('activity', self._read_activity, path if path is not None else self.gpx_path,
+                         self.timezone)
+
+    def cancel_loading(self):
+        """Stop the running loads; the previous video and activity stay loaded"""
+        for _, cancel in self._loads.values():
+            cancel.set()
+
+    def on_close(self):
+        """Stop the loader threads without waiting for running loads, then close the window"""
+        for future, cancel in self._loads.values():
+            cancel.set()
+            future.add_done_callback(self._discard_load)
+        self._loads = {}
+        self._loader.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
+
+    def _start_load(self, kind, job, *args):
+        """Run job(*args, progress) on the loader threads, replacing a running load of the same kind"""
+        if kind in self._loads:
+            future, cancel = self._loads[kind]
+            cancel.set()
+            future.add_done_callback(self._discard_load)
+        cancel = threading.Event()
+
+        def progress(text):
+            if cancel.is_set():
+                raise RuntimeError("Loading cancelled")
+            self._load_messages.put((cancel, text))
+
+        polling = bool(self._loads)
+        self._loads[kind] = (self._loader.submit(job, *args, progress), cancel)
+        if not polling:
+            self.root.after(100, self._poll_loads)
+
+    def _poll_loads(self):
+        """Show loader progress and swap in finished loads (on the Tk thread)"""
+        while True:
+            try:
+                cancel, text = self._load_messages.get_nowait()
+            except queue.Empty:
+                break
+            if not cancel.is_set():
+                self.status_var.set(text)
+
+        for kind, (future, cancel) in list(self._loads.items()):
+            if not future.done():
+                continue
+            del self._loads[kind]
+            if cancel.is_set():
+                # Loads replaced by a newer one are no longer listed, so this was Cancel Loading
+                self._discard_load(future)
+                self.status_var.set(f"Loading the {kind} cancelled")
+                continue
+            try:
+                result = future.result()
+            except Exception as e:
+                self.status_var.set(f"Error loading {'activity file' if kind == 'activity' else 'video'}: {e}")
+                continue
+            if kind == 'video':
+                self._apply_video(result)
             else:
-                self.status_var.set("Error: Could not open video file")
-    
-    def load_gpx(self):
-        """Remove GPX support."""
-        pass  # No longer needed
+                self._apply_activity(result)
+
+        if self._loads:
+            self.root.after(100, self._poll_loads)
+
+    @staticmethod
+    def _discard_load(future):
+        """Release the video a finished load opened but that will not be applied"""
+        if not future.cancelled() and future.exception() is None and 'cap' in future.result():
+            future.result()['cap'].release()
+
+    @staticmethod
+    def _read_video(path, progress):
+        """Open a video and read its properties and first frame (loader thread)"""
+        progress(f"Opening {os.path.basename(path if isinstance(path, str) else path[0])}...")
+        cap = open_video(path)
+        if not cap.isOpened():
+            raise RuntimeError("Could not open video file")
+        try:
+            progress("Probing video...")
+            result = {
+                'path': path,
+                'cap': cap,
+                'rotation': video_rotation(path),
+                'total_frames': int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+                'fps': cap.get(cv2.CAP_PROP_FPS),
+            }
+            ret, frame = cap.read()
+            result['frame'] = frame if ret else None
+            progress("Video ready")
+        except BaseException:
+            cap.release()
+            raise
+        return result
+
+    def _read_activity(self, paths, timezone, progress):
+        """Parse activity files and prepare their telemetry (loader thread)"""
+        def on_progress(done, total):
+            if total:
+                progress(f"Loading activity: {done / total:.0%}")
+            else:
+                progress(f"Loading activity: {done} records")
+
+        progress("Loading activity...")
+        store = parse_activity_files(paths, progress=on_progress)
+        progress("Drawing route map...")
+        prepared = self.prepare_telemetry(store, timezone)
+        prepared['path'] = paths
+        progress("Activity ready")
+        return prepared
+
+    @staticmethod
+    def _files_label(path, more):
+        """Label text of a path or path list, e.g. ride.mp4 (+2 chapters)"""
+        if isinstance(path, str):
+            return os.path.basename(path)
+        return f"{os.path.basename(path[0])} (+{len(path) - 1} {more})"
+
+    def _apply_video(self, result):
+        previous = self.video_cap
+        self.video_path = result['path']
+        self.video_label.config(text=self._files_label(result['path'], 'chapters'))
+        self.video_cap = result['cap']
+        self.video_rotation = result['rotation']
+        self.total_frames = result['total_frames']
+        self.video_fps = result['fps']
+        self.video_duration = self.total_frames / self.video_fps
+        if previous is not None:
+            previous.release()
+        self.clear_range()
+
+        self.timeline.config(to=self.total_frames - 1)
+
+        # Show the first frame
+        if result['frame'] is not None:
+            self.current_frame = result['frame']
+            self.current_frame_idx = 0
+            self.display_frame()
 
-    def generate_route_map(self):
-        """Generate a map with just the route line"""
-        if not self.route_points:
-            return
+        self.status_var.set(f"Video loaded: {self.total_frames} frames, {self.video_duration:.2f} seconds")
 
-        # Create a new figure with black background
-        fig, ax = plt.subplots(figsize=(8, 8), facecolor='black')
-        ax.set_facecolor('black')
-        ax.set_axis_off()
-
-        # Get route bounds and store them for later use
-        lats, lons = zip(*self.route_points)
-        self.min_lat, self.max_lat = min(lats), max(lats)
-        self.min_lon, self.max_lon = min(lons), max(lons)
-
-        # Add some padding
-        lat_pad = (self.max_lat - self.min_lat) * 0.1
-        lon_pad = (self.max_lon - self.min_lon) * 0.1
-        self.min_lat -= lat_pad
-        self.max_lat += lat_pad
-        self.min_lon -= lon_pad
-        self.max_lon += lon_pad
-        
-        ax.set_ylim(self.min_lat, self.max_lat)
-        ax.set_xlim(self.min_lon, self.max_lon)
+    def _apply_activity(self, prepared):
+        self.gpx_path = prepared['path']
+        self.gpx_label.config(text=self._files_label(prepared['path'], 'files'))
+        self.apply_telemetry(prepared)
 
-        # Plot the route line with bright white color
-        ax.plot(lons, lats, color='white', linewidth=5, alpha=1.0, solid_capstyle='round')
+        # Display summary with additional metrics
+        data = self.gpx_data
+        if len(data):
+            start_time = self.telemetry_start()
+            duration = (data['time'][-1] - data['time'][0]) / 1e9 / 60
+            end_time = start_time + datetime.timedelta(minutes=duration)
 
-        # Convert to image
-        canvas = FigureCanvasAgg(fig)
-        canvas.draw()
-        
-        # Convert to numpy array with transparent background
-        rgba = np.asarray(canvas.buffer_rgba())
-        plt.close(fig)
+            summary = (f"Start: {start_time.strftime('%H:%M:%S')}, "
+                      f"End: {end_time.strftime('%H:%M:%S')}, "
+                      f"Duration: {duration:.1f} min")
 
-        # Resize to desired size
-        self.map_img = cv2.resize(rgba, (self.map_size, self.map_size), 
-                                interpolation=cv2.INTER_AREA)
+            # Add activity type if available
+            if data.valid('activity_type').any():
+                activity = data.activity_types[data['activity_type'][data.valid('activity_type')][0]]
+                summary += f", Activity: {activity}"
 
-    def latlon_to_pixels(self, lat, lon):
-        """Convert latitude/longitude to pixel coordinates on map"""
-        # Normalize to 0-1
-        if self.max_lon == self.min_lon or self.max_lat == self.min_lat:
-            return 0, 0  # Avoid division by zero
-        x_norm = (lon - self.min_lon) / (self.max_lon - self.min_lon)
-        y_norm = (lat - self.min_lat) / (self.max_lat - self.min_lat)
-        # Convert to pixel coordinates (invert y for image coordinates)
-        x = int(x_norm * (self.map_size - 1))
-        y = int((1 - y_norm) * (self.map_size - 1))
-        # Clamp to image bounds
-        x = max(0, min(self.map_size - 1, x))
-        y = max(0, min(self.map_size - 1, y))
-        return x, y
+            # Add other metrics
+            if data.valid('heart_rate').any():
+                heart_rate = data['heart_rate'][data.valid('heart_rate')]
+                summary += f", Avg HR: {heart_rate.mean():.0f}, Max HR: {heart_rate.max():.0f}"
 
-    def load_fit_file(self):
-        """Load and parse .fit file data"""
-        try:
-            from fitparse import FitFile
+            if data.valid('speed').any():
+                speed = data['speed'][data.valid('speed')] * 3.6  # Convert to km/h
+                summary += f", Avg Speed: {speed.mean():.1f} km/h, Max: {speed.max():.1f} km/h"
 
-            fitfile = FitFile(self.gpx_path)
-            
-            # Print available data fields from the first record message
-            print("\nAvailable .FIT file parameters:")
-            print("-" * 50)
-            first_record = next(fitfile.get_messages('record'))
-            fields_dict = {}
-            
-            for field in first_record:
-                print(f"{field.name}: {field.value} {field.units}")
-                field_value = field.value
-                if field_value is not None:  # Only show fields that have values
-                    fields_dict[field.name] = {
-                        'value': field_value,
-                        'units': field.units if field.units else 'none'
-                    }
-            
-            # Print in a nicely formatted way
-            print(f"{'Parameter':<30} {'Value':<20} {'Units'}")
-            print("-" * 65)
-            for name, info in sorted(fields_dict.items()):
-                print(f"{name:<30} {str(info['value']):<20} {info['units']}")
-            print("-" * 65 + "\n")
-
-            data = []
-            
-            for record in fitfile.get_messages('record'):
-                point_data = {
-                    'time': None,
-                    'latitude': None,
-                    'longitude': None,
-                    'elevation': None,
-                    'heart_rate': None,
-                    'cadence': None,
-                    'speed': None,
-                    'distance': None,
-                    'activity_type': None,
-                    'avg_heart_rate': None,
-                    'avg_speed': None  # Retain only relevant fields
-                }
-                
-                # Extract data from record
-                for field in record:
-                    if field.name == 'timestamp':
-                        point_data['time'] = field.value
-                    elif field.name == 'position_lat':
-                        # Convert semicircles to degrees
-                        if field.value is not None:
-                            point_data['latitude'] = field.value * 180.0 / 2**31
-                    elif field.name == 'position_long':
-                        # Convert semicircles to degrees
-                        if field.value is not None:
-                            point_data['longitude'] = field.value * 180.0 / 2**31
-                    elif field.name == 'enhanced_altitude':  # Prefer enhanced_altitude over altitude
-                        point_data['elevation'] = field.value
-                    elif field.name == 'enhanced_speed':  # Prefer enhanced_speed over speed
-                        # Already in m/s, no need to convert
-                        point_data['speed'] = field.value
-                    elif field.name == 'heart_rate':
-                        point_data['heart_rate'] = field.value
-                    elif field.name == 'cadence':
-                        point_data['cadence'] = field.value
-                    elif field.name == 'distance':
-                        point_data['distance'] = field.value
-                    elif field.name == 'activity_type':
-                        point_data['activity_type'] = field.value
-                    elif field.name == 'avg_heart_rate':
-                        point_data['avg_heart_rate'] = field.value
-                    elif field.name == 'avg_speed':
-                        point_data['avg_speed'] = field.value
-
-                # Only add points that have position data
-                if point_data['latitude'] is not None and point_data['longitude'] is not None:
-                    data.append(point_data)
-            
-            # Convert to DataFrame for easier manipulation
-            self.gpx_data = pd.DataFrame(data)
-            
-            # Display summary with additional metrics
-            if not self.gpx_data.empty:
-                start_time = self.gpx_data['time'].min()
-                end_time = self.gpx_data['time'].max()
-                duration = (end_time - start_time).total_seconds() / 60
-                
-                summary = (f"Start: {start_time.strftime('%H:%M:%S')}, "
-                          f"End: {end_time.strftime('%H:%M:%S')}, "
-                          f"Duration: {duration:.1f} min")
-                
-                # Add activity type if available
-                if not self.gpx_data['activity_type'].isna().all():
-                    activity = self.gpx_data['activity_type'].iloc[0]
-                    summary += f", Activity: {activity}"
-                
-                # Add other metrics
-                if not self.gpx_data['heart_rate'].isna().all():
-                    avg_hr = self.gpx_data['heart_rate'].mean()
-                    max_hr = self.gpx_data['heart_rate'].max()
-                    summary += f", Avg HR: {avg_hr:.0f}, Max HR: {max_hr:.0f}"
-                
-                if not self.gpx_data['speed'].isna().all():
-                    avg_speed = self.gpx_data['speed'] * 3.6  # Convert to km/h
-                    max_speed = self.gpx_data['speed'].max() * 3.6
-                    summary += f", Avg Speed: {avg_speed.mean():.1f} km/h, Max: {max_speed:.1f} km/h"
-                
-                self.status_var.set(summary)
-
-                # After loading FIT data, prepare route points for map
-                if not self.gpx_data.empty:
-                    self.route_points = list(zip(
-                        self.gpx_data['latitude'].tolist(),
-                        self.gpx_data['longitude'].tolist()
-                    ))
-                    self.generate_route_map()
-                
-        except Exception as e:
-            self.status_var.set(f"Error loading FIT file: {str(e)}")
+            summary += f", Memory: {data.bytes_per_100k() / 2**20:.1f} MB per 100k samples"
+
+            self.status_var.set(summary)
+
+        if self.current_frame is not None:
+            self.display_frame()
 
-    def calculate_speed(self, data):
-        """Calculate speed between points in m/s"""
-        speeds = [0]  # First point has no speed
-        
-        for i in range(1, len(data)):
-            prev_point = data.iloc[i-1]
-            curr_point = data.iloc[i]
-            
-            if prev_point['time'] and curr_point['time']:
-                # Calculate time difference in seconds
-                time_diff = (curr_point['time'] - prev_point['time']).total_seconds()
-                
-                if time_diff > 0:
-                    # Calculate distance using haversine formula
-                    from math import radians, sin, cos, sqrt, atan2
-                    
-                    lat1, lon1 = radians(prev_point['latitude']), radians(prev_point['longitude'])
-                    lat2, lon2 = radians(curr_point['latitude']), radians(curr_point['longitude'])
-                    
-                    # Haversine formula
-                    R = 6371000  # Earth radius in meters
-                    dlon = lon2 - lon1
-                    dlat = lat2 - lat1
-                    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-                    c = 2 * atan2(sqrt(a), sqrt(1-a))
-                    distance = R * c
-                    
-                    # Account for elevation change
-                    if prev_point['elevation'] is not None and curr_point['elevation'] is not None:
-                        ele_diff = curr_point['elevation'] - prev_point['elevation']
-                        distance = sqrt(distance**2 + ele_diff**2)
-                    
-                    speed = distance / time_diff  # m/s
-                    speeds.append(speed)
-                else:
-                    speeds.append(0)
-            else:
-                speeds.append(0)
-        
-        return speeds
-    
-    def calculate_distance(self, data):
-        """Calculate cumulative distance in meters"""
-        distances = [0]  # First point has no distance
-        total_distance = 0
-        
-        for i in range(1, len(data)):
-            prev_point = data.iloc[i-1]
-            curr_point = data.iloc[i]
-            
-            # Calculate distance using haversine formula
-            from math import radians, sin, cos, sqrt, atan2
-            
-            lat1, lon1 = radians(prev_point['latitude']), radians(prev_point['longitude'])
-            lat2, lon2 = radians(curr_point['latitude']), radians(curr_point['longitude'])
-            
-            # Haversine formula
-            R = 6371000  # Earth radius in meters
-            dlon = lon2 - lon1
-            dlat = lat2 - lat1
-            a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-            c = 2 * atan2(sqrt(a), sqrt(1-a))
-            distance = R * c
-            
-            # Account for elevation change
-            if prev_point['elevation'] is not None and curr_point['elevation'] is not None:
-                ele_diff = curr_point['elevation'] - prev_point['elevation']
-                distance = sqrt(distance**2 + ele_diff**2)
-            
-            total_distance += distance
-            distances.append(total_distance)
-        
-        return distances
-    
     def update_offset(self, value=None):
         """Update GPX time offset (for legacy direct calls)."""
         self._apply_all_settings()
@@ -708,194 +2958,29 @@ class GPXVideoOverlay:
         if self.current_frame is not None:
             self.display_frame()
     
-    def get_gpx_data_at_time(self, video_time):
-        """Get GPX data at the given video time, accounting for offset"""
-        if self.gpx_data is None or self.gpx_data.empty:
-            return None
-        
-        # Adjusted time with offset
-        adjusted_time = video_time + self.gpx_start_offset
-        
-        if adjusted_time < 0:
-            # Before GPX data starts
-            return None
-        
-        # Get start time of GPX data
-        gpx_start_time = self.gpx_data['time'].min()
-        
-        # Calculate target time
-        target_time = gpx_start_time + datetime.timedelta(seconds=adjusted_time)
-        
-        # Find closest time in GPX data
-        time_list = self.gpx_data['time'].tolist()
-        idx = bisect_left(time_list, target_time)
-        
-        if idx >= len(time_list):
-            idx = len(time_list) - 1
-        elif idx > 0:
-            # Check if previous point is closer
-            if (target_time - time_list[idx-1]) < (time_list[idx] - target_time):
-                idx = idx - 1
-
-        # Compute cumulative averages for heart rate and speed
-        if idx >= 0:
-            valid_hr = self.gpx_data['heart_rate'][:idx + 1].dropna()
-            valid_speed = self.gpx_data['speed'][:idx + 1].dropna()
-            
-            avg_heart_rate = valid_hr.mean() if not valid_hr.empty else None
-            avg_speed = valid_speed.mean() if not valid_speed.empty else None
-            
-            self.gpx_data.at[idx, 'avg_heart_rate'] = avg_heart_rate
-            self.gpx_data.at[idx, 'avg_speed'] = avg_speed
-
-        return self.gpx_data.iloc[idx]
-    
-    def create_overlay_image(self, frame, gpx_point):
-        """Create overlay image with metrics in F1-style"""
-        if gpx_point is None:
-            return frame
-
-        h, w = frame.shape[:2]
-        overlay = frame.copy()
-
-        # Add other overlays (time, heart rate, etc.)
-        # Create base position and styling
-        margin = 20
-        box_height = 38  # smaller height
-        box_padding = 10  # smaller padding
-        box_spacing = 2
-        current_y = margin
-        current_x = margin
-        fixed_width = 180  # smaller width
-        font_size = 0.55  # smaller font
-        font_thickness = 1  # thinner font
-
-        bg_color = (16, 16, 16)
-        alpha = 0.65
-
-        metrics = []
-        
-        if self.overlay_settings['activity_type'] and gpx_point.get('activity_type') is not None:
-            metrics.append(('activity_type', f"{self.ICONS['activity_type']} {gpx_point['activity_type']}"))
-
-        if self.overlay_settings['time']:
-            gpx_time = gpx_point['time']
-            if gpx_time.tzinfo is None:
-                gpx_time = pytz.utc.localize(gpx_time)
-            local_time = gpx_time.astimezone(self.timezone)
-            metrics.append(('time', f"{self.ICONS['time']} {local_time.strftime('%H:%M:%S')}"))
-        
-        if self.overlay_settings['heart_rate'] and gpx_point.get('heart_rate') is not None:
-            metrics.append(('heart_rate', f"{self.ICONS['heart_rate']} {int(gpx_point['heart_rate'])} BPM"))
-        
-        if self.overlay_settings['speed'] and gpx_point.get('speed') is not None:
-            speed_kmh = gpx_point['speed'] * 3.6
-            if speed_kmh > 0:
-                pace_per_km = 60 / speed_kmh  # Calculate pace in minutes per km
-                minutes = int(pace_per_km)
-                seconds = int((pace_per_km - minutes) * 60)
-                metrics.append(('speed', f"{self.ICONS['speed']} {minutes}:{seconds:02d} /km"))
-            else:
-                metrics.append(('speed', f"{self.ICONS['speed']} --:-- /km"))
-
-        if self.overlay_settings['avg_heart_rate'] and gpx_point.get('avg_heart_rate') is not None:
-            metrics.append(('avg_heart_rate', f"{self.ICONS['avg_heart_rate']} {int(gpx_point['avg_heart_rate'])} BPM"))
-
-        if self.overlay_settings['avg_speed'] and gpx_point.get('avg_speed') is not None:
-            avg_speed_kmh = gpx_point['avg_speed'] * 3.6  # Convert to km/h
-            if avg_speed_kmh > 0:
-                avg_pace_per_km = 60 / avg_speed_kmh  # Calculate average pace in minutes per km
-                minutes = int(avg_pace_per_km)
-                seconds = int((avg_pace_per_km - minutes) * 60)
-                metrics.append(('avg_speed', f"{self.ICONS['avg_speed']} {minutes}:{seconds:02d} /km"))
-            else:
-                metrics.append(('avg_speed', f"{self.ICONS['avg_speed']} --:-- /km"))
-
-        if self.overlay_settings['cadence'] and gpx_point.get('cadence') is not None:
-            metrics.append(('cadence', f"{self.ICONS['cadence']} {int(gpx_point['cadence'])} SPM"))
-
-        if self.overlay_settings['elevation'] and gpx_point.get('elevation') is not None:
-            metrics.append(('elevation', f"{self.ICONS['elevation']} {int(gpx_point['elevation'])}m"))
-
-        if self.overlay_settings['distance'] and gpx_point.get('distance') is not None:
-            distance_km = gpx_point['distance'] / 1000
-            metrics.append(('distance', f"{self.ICONS['distance']} {distance_km:.2f}km"))
-
-        # Draw the overlays
-        overlay_layer = overlay.copy()
-
-        for i, (metric_type, text) in enumerate(metrics):
-            # Draw background box with fixed width
-            pts = np.array([
-                [current_x, current_y],
-                [current_x + fixed_width, current_y],
-                [current_x + fixed_width, current_y + box_height],
-                [current_x, current_y + box_height]
-            ], np.int32)
-            
-            cv2.fillPoly(overlay_layer, [pts], bg_color)
-            cv2.polylines(overlay_layer, [pts], True, (64, 64, 64), 1, cv2.LINE_AA)
-            
-            # Left-align text with padding
-            text_x = int(current_x + box_padding)  # Convert to integer
-            text_y = int(current_y + (box_height * 0.7))  # Convert to integer and adjust vertical position
-            
-            if self.has_custom_font:
-                try:
-                    font_face = cv2.freetype.createFreeType2()
-                    font_face.loadFontData(self.font_path, 0)
-                    font_face.putText(overlay_layer, text,
-                                    (text_x, text_y),
-                                    box_height-box_padding*2,
-                                    (255, 255, 255), -1, cv2.LINE_AA)
-                except Exception:
-                    # Fallback to default font if custom font fails
-                    cv2.putText(overlay_layer, text,
-                              (text_x, text_y),
-                              cv2.FONT_HERSHEY_SIMPLEX,
-                              font_size, (255, 255, 255),
-                              font_thickness, cv2.LINE_AA)
-            else:
-                cv2.putText(overlay_layer, text,
-                          (text_x, text_y),
-                          cv2.FONT_HERSHEY_SIMPLEX,
-                          font_size, (255, 255, 255),
-                          font_thickness, cv2.LINE_AA)
-            
-            current_y += box_height + box_spacing
-
-        # Blend the overlay layer with the original frame
-        overlay = cv2.addWeighted(overlay, 1-alpha, overlay_layer, alpha, 0)
-
-        return overlay
-    
     def display_frame(self):
         """Display current frame with overlays"""
         if self.current_frame is None:
             return
 
-        # Get base frame and apply rotation if needed
-        frame = cv2.rotate(self.current_frame, cv2.ROTATE_180) if self.rotate_180.get() else self.current_frame.copy()
+        # Get base frame upright (metadata rotation plus the 180° option), into a reused buffer
+        rotation = (self.video_rotation + (180 if self.rotate_180.get() else 0)) % 360
+        height, width = self.current_frame.shape[:2]
+        shape = (width, height, 3) if rotation in (90, 270) else (height, width, 3)
+        if self._display_buffer is None or self._display_buffer.shape != shape:
+            self._display_buffer = np.empty(shape, np.uint8)
+        frame = orient_frame(self.current_frame, rotation, dst=self._display_buffer)
 
-        # Calculate video time
+        # Create overlay for the current video time
         video_time = self.current_frame_idx / self.video_fps
-
-        # Get GPX data for this time
-        gpx_point = self.get_gpx_data_at_time(video_time)
-
-        # Create overlay
-        frame_with_overlay = self.create_overlay_image(frame, gpx_point)
-
-        # Convert to RGB for tkinter
-        frame_rgb = cv2.cvtColor(frame_with_overlay, cv2.COLOR_BGR2RGB)
-        frame_pil = Image.fromarray(frame_rgb)
+        self.overlay_frame(frame, video_time, inplace=True)
         
         # Get current canvas size
         canvas_width = self.canvas.winfo_width()
         canvas_height = self.canvas.winfo_height()
         
         if canvas_width > 1 and canvas_height > 1:  # Check if canvas is realized
-            img_h, img_w = frame_rgb.shape[:2]
+            img_h, img_w = frame.shape[:2]
             aspect_ratio = img_w / img_h
             
             # Calculate new dimensions to fill canvas while preserving aspect ratio
@@ -910,8 +2995,12 @@ class GPXVideoOverlay:
                 new_width = canvas_width
                 new_height = int(new_width / aspect_ratio)
             
-            # Resize the image
-            frame_pil = frame_pil.resize((new_width, new_height), Image.LANCZOS)
+            # Resize before the color conversion so only the preview size is converted
+            frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_AREA)
+
+        # Convert to RGB for tkinter
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        frame_pil = Image.fromarray(frame_rgb)
         
         # Convert to PhotoImage
         self.photo = ImageTk.PhotoImage(frame_pil)
@@ -946,8 +3035,10 @@ class GPXVideoOverlay:
             return
 
         try:
-            self.video_cap.set(cv2.CAP_PROP_POS_FRAMES, self.current_frame_idx)
-            ret, frame = self.video_cap.read()
+            # Only seek when the capture isn't already at the frame (seeking decodes from a keyframe)
+            if int(self.video_cap.get(cv2.CAP_PROP_POS_FRAMES)) != self.current_frame_idx:
+                self.video_cap.set(cv2.CAP_PROP_POS_FRAMES, self.current_frame_idx)
+            ret, frame = self.video_cap.read(self.current_frame)
             if not ret:
                 self.stop_preview()
                 return
@@ -977,100 +3068,278 @@ class GPXVideoOverlay:
             self.status_var.set("Error: Please select video, FIT file, and output path")
             return
 
-        self.video_cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-        width = int(self.video_cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(self.video_cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        fps = self.video_cap.get(cv2.CAP_PROP_FPS)
+        profile_name = self.export_profile_var.get()
+        profile = EXPORT_PROFILES.get(profile_name, EXPORT_PROFILES['master'])
 
-        # Always use input resolution and fps for output
-        if hasattr(self, 'min_duration') and self.min_duration is not None:
-            max_frames = int(self.min_duration * fps)
-        else:
-            max_frames = int(self.video_cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        start_frame, end_frame = self.get_export_range()
+        max_frames = end_frame - start_frame
+        self.status_var.set(f"Starting {profile_name} export: Processing {max_frames} frames...")
+        self.root.update()
 
-        temp_output = os.path.splitext(self.output_path)[0] + "_temp.avi"
-        # Use FFV1 lossless codec for temp AVI to avoid quality loss
-        fourcc = cv2.VideoWriter_fourcc(*'FFV1')
-        out = cv2.VideoWriter(temp_output, fourcc, fps, (width, height))
+        try:
+            stats = self.render_resumable(self.video_path, self.output_path, profile, start_frame, end_frame,
+                                          rotate=self.rotate_180.get(), progress=self._export_progress(),
+                                          backend=self.export_backend_var.get())
+            if ffmpeg_available():
+                status = f"Export complete: {self.output_path}"
+                if stats['resumed_frames']:
+                    status += f" (resumed, {stats['resumed_frames']} frames reused)"
+            else:
+                status = f"Export complete without audio (ffmpeg not available): {self.output_path}"
+            status += f" ({panel_reuse_text(stats)})"
+            if stats['peak_rss_mb'] is not None:
+                status += f" (peak memory {stats['peak_rss_mb']:.0f} MB)"
+            self.status_var.set(status)
+        except Exception as e:
+            self.status_var.set(f"Error during export (export again with the same settings to resume): {str(e)}")
 
-        if not out.isOpened():
-            self.status_var.set("Error: Could not create output video writer")
+    def export_overlay_track(self):
+        """Export the overlay alone on a transparent background for video editors"""
+        if self.video_cap is None or self.gpx_data is None:
+            self.status_var.set("Error: Load both video and FIT files first")
             return
 
-        frame_idx = 0
-        self.status_var.set(f"Starting export: Processing {max_frames} frames...")
+        path = filedialog.asksaveasfilename(defaultextension=".mov",
+                                            filetypes=[("QuickTime files", "*.mov")])
+        if not path:
+            return
+
+        start_frame, end_frame = self.get_export_range()
+        self.status_var.set(f"Starting overlay-only export: {end_frame - start_frame} frames...")
         self.root.update()
 
         try:
-            while frame_idx < max_frames:
-                self.video_cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-                ret, frame = self.video_cap.read()
-                if not ret:
-                    break
-                if self.rotate_180.get():
-                    frame = cv2.rotate(frame, cv2.ROTATE_180)
-                video_time = frame_idx / fps
-                gpx_point = self.get_gpx_data_at_time(video_time)
-                frame_with_overlay = self.create_overlay_image(frame, gpx_point)
-                # Write frame with same resolution as input
-                out.write(frame_with_overlay)
-                frame_idx += 1
-                progress = int(frame_idx / max_frames * 100)
-                self.status_var.set(f"Exporting: {progress}% ({frame_idx}/{max_frames})")
-                if frame_idx % 30 == 0:
-                    self.root.update()
-            out.release()
-
-            # Ensure the file is flushed and closed before conversion
-            import time
-            time.sleep(0.5)
-
-            # Use ffmpeg to combine the overlayed video with the original audio
-            try:
-                import subprocess
-                # Check if ffmpeg is available
-                try:
-                    subprocess.check_output(['ffmpeg', '-version'], stderr=subprocess.STDOUT)
-                    has_ffmpeg = True
-                except Exception:
-                    has_ffmpeg = False
-
-                if has_ffmpeg:
-                    final_output = self.output_path
-                    # Use -crf 18 for visually lossless H.264 output
-                    cmd = [
-                        'ffmpeg', '-y',
-                        '-i', temp_output,      # Input: video with overlays (lossless)
-                        '-i', self.video_path,  # Input: original video for audio
-                        '-c:v', 'libx264',      # Encode video to H.264
-                        '-crf', '18',           # High quality (visually lossless)
-                        '-preset', 'slow',      # Good quality preset
-                        '-c:a', 'copy',         # Copy audio without re-encoding
-                        '-map', '0:v:0',        # Take video from the first input
-                        '-map', '1:a?',         # Automatically include all audio streams from the second input
-                        '-movflags', '+faststart',
-                        final_output
-                    ]
-                    subprocess.run(cmd, check=True)
-                    if os.path.exists(temp_output):
-                        os.remove(temp_output)
-                    self.status_var.set(f"Export complete: {final_output}")
-                else:
-                    self.status_var.set("Error: ffmpeg is not available. Cannot add audio.")
-            except Exception as e:
-                self.status_var.set(f"Error during export: {str(e)}")
-                if os.path.exists(temp_output):
-                    os.remove(temp_output)
-
+            stats = self.render_overlay_track(self.video_path, path, start_frame, end_frame,
+                                              codec=self.overlay_codec_var.get(),
+                                              progress=self._export_progress())
+            self.status_var.set(f"Overlay export complete: {path} ({stats['frames']} frames)")
         except Exception as e:
             self.status_var.set(f"Error during export: {str(e)}")
-            if out.isOpened():
-                out.release()
 
-        self.video_cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    def _export_progress(self):
+        """Progress callback for exports that keeps the window responsive"""
+        last_update = 0
+
+        def on_progress(frame_idx, total):
+            nonlocal last_update
+            progress = int(frame_idx / total * 100)
+            self.status_var.set(f"Exporting: {progress}% ({frame_idx}/{total})")
+            if frame_idx - last_update >= 30:
+                last_update = frame_idx
+                self.root.update()
+
+        return on_progress
+
+
+class ActivityIntervalIndex:
+    """Activities by [start, end] time range, for finding the ones a clip overlaps.
+
+    Ranges are kept sorted by start with a running maximum of the ends, so an
+    overlap query is two binary searches plus a scan of the actual candidates,
+    which stays fast with thousands of activities.
+    """
+
+    def __init__(self):
+        self.paths = []
+        self.starts = np.empty(0, np.int64)
+        self.ends = np.empty(0, np.int64)
+        self._max_end = np.empty(0, np.int64)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def update(self, ranges):
+        """Replace the index with a {path: (start_ns, end_ns)} mapping"""
+        paths = list(ranges)
+        starts = np.array([ranges[path][0] for path in paths], np.int64)
+        order = np.argsort(starts, kind='stable')
+        self.paths = [paths[i] for i in order]
+        self.starts = starts[order]
+        self.ends = np.array([ranges[path][1] for path in paths], np.int64)[order]
+        self._max_end = np.maximum.accumulate(self.ends) if len(self.ends) else self.ends
+
+    def overlapping(self, start, end):
+        """Indices of the activities overlapping [start, end]"""
+        # Activities starting after the clip ends can't overlap...
+        last = np.searchsorted(self.starts, end, side='right')
+        # ...and neither can any before the first one whose running max end reaches the clip
+        first = np.searchsorted(self._max_end[:last], start, side='left')
+        candidates = np.arange(first, last)
+        return candidates[self.ends[first:last] >= start]
+
+    def best_match(self, start, end):
+        """(path, start_ns) of the activity overlapping [start, end] the most, or None"""
+        candidates = self.overlapping(start, end)
+        if not len(candidates):
+            return None
+        overlap = np.minimum(self.ends[candidates], end) - np.maximum(self.starts[candidates], start)
+        row = candidates[np.argmax(overlap)]
+        return self.paths[row], int(self.starts[row])
+
+
+def _activity_time_range(path):
+    """(start_ns, end_ns) of an activity file, or None if it has no samples"""
+    store = parse_activity_file(path)
+    if not len(store):
+        return None
+    return int(store['time'][0]), int(store['time'][-1])
+
+
+# Per-process renderers of watch-folder workers, by activity file
+_watch_renderers = {}
+
+
+def _render_watch_clip(job):
+    renderer = _watch_renderers.get(job['activity'])
+    if renderer is None:
+        settings = job['settings']
+        renderer = OverlayRenderer()
+        renderer.overlay_settings.update(settings.get('overlay_settings', {}))
+        renderer.timezone = pytz.timezone(settings.get('timezone', 'Europe/Berlin'))
+        renderer.graph_window_seconds = settings.get('graph_window_seconds', renderer.graph_window_seconds)
+        renderer.set_telemetry(parse_activity_file(job['activity']))
+        if len(_watch_renderers) >= 4:
+            _watch_renderers.pop(next(iter(_watch_renderers)))  # Keep the most recent activities only
+        _watch_renderers[job['activity']] = renderer
+    settings = job['settings']
+    renderer.gpx_start_offset = job['offset']
+    return renderer.render_resumable(job['video'], job['output'], EXPORT_PROFILES[settings.get('profile', 'standard')],
+                                     rotate=bool(settings.get('rotate_180', False)), threads=job['threads'],
+                                     backend=settings.get('backend', 'python'))
+
+
+def watch_folder(directory, settings=None, interval=10.0, once=False):
+    """Render every clip dropped into a directory against the activity it was recorded in.
+
+    The directory (and its subdirectories) is scanned every interval seconds.
+    Activity files are indexed by time range in an ActivityIntervalIndex, cached
+    in WATCH_INDEX_NAME so a restart only parses new or changed files. A video
+    is picked up once its size stopped changing between two scans; its creation
+    time and duration (ffprobe) find the activity it overlaps the most, which
+    gives the initial offset. Renders go to <directory>/rendered/ through a
+    bounded process pool and are resumable, so restarting the daemon continues
+    interrupted renders. settings takes the batch spec keys except "fit" and
+    "clips". With once=True a single scan is rendered and the function returns
+    the number of failed clips.
+    """
+    settings = settings or {}
+    output_dir = os.path.join(directory, 'rendered')
+    index_path = os.path.join(directory, WATCH_INDEX_NAME)
+    os.makedirs(output_dir, exist_ok=True)
+
+    cached = {}
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            cached = json.load(f)  # path -> [size, mtime, start_ns, end_ns] (start None if empty)
+    index = ActivityIntervalIndex()
+    index.update({path: entry[2:] for path, entry in cached.items() if entry[2] is not None})
+
+    cpu_budget = int(settings.get('cpu_budget') or os.cpu_count() or 1)
+    workers = max(1, int(settings.get('workers') or cpu_budget // 4 or 1))
+    threads = max(1, cpu_budget // workers)
+
+    last_seen = {}  # path -> (size, mtime) at the previous scan
+    handled = set()  # Videos queued, rendered, or skipped for good
+    futures = {}
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            # Files that didn't change since the last scan are complete (not still being copied)
+            stable = {'video': [], 'activity': []}
+            seen = {}
+            for root, dirs, files in os.walk(directory):
+                dirs[:] = [d for d in dirs if os.path.join(root, d) != output_dir]
+                for name in files:
+                    path = os.path.join(root, name)
+                    ext = os.path.splitext(name)[1].lower()
+                    kind = 'video' if ext in WATCH_VIDEO_EXTENSIONS else \
+                        'activity' if ext in WATCH_ACTIVITY_EXTENSIONS else None
+                    if kind is None:
+                        continue
+                    stat = os.stat(path)
+                    seen[path] = (stat.st_size, stat.st_mtime)
+                    if once or last_seen.get(path) == seen[path]:
+                        stable[kind].append(path)
+            last_seen = seen
+
+            # Index new and changed activities in parallel
+            changed = [path for path in stable['activity']
+                       if cached.get(path, [None, None])[:2] != list(seen[path])]
+            deleted = [path for path in cached if path not in seen]
+            for path in deleted:
+                del cached[path]  # Deleted from the folder
+            if changed:
+                with ProcessPoolExecutor() as indexer:
+                    for path, time_range in zip(changed, indexer.map(_activity_time_range, changed)):
+                        cached[path] = list(seen[path]) + list(time_range or (None, None))
+            if changed or deleted:
+                with open(index_path + '.tmp', 'w') as f:
+                    json.dump(cached, f)
+                os.replace(index_path + '.tmp', index_path)
+                index.update({path: entry[2:] for path, entry in cached.items() if entry[2] is not None})
+                print(f"Indexed {len(changed)} activity files, removed {len(deleted)} ({len(index)} activities)")
+
+            for video in stable['video']:
+                if video in handled:
+                    continue
+                output = os.path.join(output_dir, os.path.splitext(os.path.relpath(video, directory))[0] + '_overlay.mp4')
+                if os.path.exists(output) and not os.path.exists(output + '.segments'):
+                    handled.add(video)  # Rendered by an earlier run
+                    continue
+                creation_time, duration = probe_video(video)
+                if creation_time is None:
+                    print(f"Skipping {video}: no creation time in the container")
+                    handled.add(video)
+                    continue
+                start = (creation_time - EPOCH) // datetime.timedelta(microseconds=1) * 1000
+                match = index.best_match(start, start + int(duration * 1e9))
+                if match is None:
+                    continue  # The activity may not be copied yet; try again next scan
+                activity, activity_start = match
+                offset = (start - activity_start) / 1e9 + settings.get('clock_offset', 0.0)
+                os.makedirs(os.path.dirname(output), exist_ok=True)
+                job = {'activity': activity, 'video': video, 'output': output, 'offset': offset,
+                       'settings': settings, 'threads': threads}
+                futures[pool.submit(_render_watch_clip, job)] = job
+                handled.add(video)
+                print(f"Queued {video} with {os.path.basename(activity)} (offset {offset:.1f} s)")
+
+            for future in [future for future in futures if future.done() or once]:
+                job = futures.pop(future)
+                try:
+                    stats = future.result()
+                    print(f"Rendered {job['output']} ({stats['frames']} frames, {panel_reuse_text(stats)})")
+                except Exception as e:
+                    failures += 1
+                    print(f"Failed to render {job['video']}: {e}")
+
+            if once:
+                return failures
+            time.sleep(interval)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Overlay Garmin FIT data onto videos")
+    parser.add_argument('--batch', metavar='JOB_JSON',
+                        help="render all clips of a batch job spec without opening the GUI")
+    parser.add_argument('--watch', metavar='DIR',
+                        help="keep rendering clips dropped into DIR, matched to the activity files there")
+    parser.add_argument('--settings', metavar='SETTINGS_JSON',
+                        help="render settings for --watch (batch spec keys without fit and clips)")
+    parser.add_argument('--interval', type=float, default=10.0,
+                        help="seconds between scans of the watched folder")
+    parser.add_argument('--once', action='store_true',
+                        help="with --watch: render what is there now and exit")
+    args = parser.parse_args()
+    if args.batch:
+        sys.exit(1 if run_batch(args.batch) else 0)
+    if args.watch:
+        watch_settings = {}
+        if args.settings:
+            with open(args.settings) as f:
+                watch_settings = json.load(f)
+        sys.exit(1 if watch_folder(args.watch, watch_settings, args.interval, args.once) else 0)
+
     root = tk.Tk()
     app = GPXVideoOverlay(root)
     root.mainloop()
\ No newline at end of file